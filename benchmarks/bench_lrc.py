@@ -0,0 +1,116 @@
+"""LRC 解析微基准：生成大批量歌词，比较 parse_lrc 与旧版逐行解析的吞吐量
+
+普通歌词（模拟接口的 make_lrc）上 parse_lrc 的耗时超过旧版的 --max-ratio 倍时以非零状态退出。
+两种解析交替运行多轮、各取最快一轮，减少机器负载波动的影响。只依赖 music_core，不需要 PyQt5。
+用法: python benchmarks/bench_lrc.py [歌曲数] [--repeat 15] [--max-ratio 1.15]
+"""
+import argparse
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from music_core import parse_lrc
+from mock_server import make_lrc
+
+
+def legacy_parse(lrc_text):
+    """旧版 AsyncLoader.parse_lyrics，只读第一个时间标签，用作对照"""
+    lyrics = []
+    for line in lrc_text.split('\n'):
+        if '[' in line and ']' in line:
+            time_str = line[line.find('[') + 1:line.find(']')]
+            try:
+                if '.' in time_str:
+                    m, s = time_str.split(':')
+                    s, ms = s.split('.')
+                    t = int(m) * 60000 + int(s) * 1000 + int(ms) * 10
+                else:
+                    m, s = time_str.split(':')
+                    t = int(m) * 60000 + int(s) * 1000
+                text = line[line.find(']') + 1:].strip()
+                if text:
+                    lyrics.append((t, text))
+            except ValueError:
+                continue
+    return sorted(lyrics)
+
+
+def make_song(rng, lines=80):
+    """生成一首带元数据、多时间标签、逐字时间和双语翻译的歌词"""
+    out = ['[ti:标题]', '[ar:歌手]', '[al:专辑]', '[offset:120]']
+    t = 0
+    for i in range(lines):
+        t += rng.randint(1500, 5000)
+        tag = f'[{t // 60000:02d}:{t // 1000 % 60:02d}.{t % 1000 // 10:02d}]'
+        kind = i % 4
+        if kind == 0:
+            # 副歌：一行多个时间标签
+            t2 = t + 60000
+            out.append(f'{tag}[{t2 // 60000:02d}:{t2 // 1000 % 60:02d}.{t2 % 1000:03d}]副歌第{i}行')
+        elif kind == 1:
+            words = ''.join(f'<{(t + k * 300) // 60000:02d}:{(t + k * 300) // 1000 % 60:02d}.{(t + k * 300) % 1000 // 10:02d}>字'
+                            for k in range(8))
+            out.append(f'{tag}{words}')
+        elif kind == 2:
+            out.append(f'{tag}Verse line {i}')
+            out.append(f'{tag}第{i}行的翻译')
+        else:
+            out.append(f'{tag}普通歌词第{i}行')
+    return '\n'.join(out)
+
+
+def run_once(func, corpus):
+    started = time.perf_counter()
+    for text in corpus:
+        func(text)
+    return time.perf_counter() - started
+
+
+def compare(corpus, repeat):
+    """旧版和 parse_lrc 交替运行 repeat 轮，返回各自最快一轮的秒数"""
+    legacy = current = float('inf')
+    for i in range(repeat):
+        # 每轮交换先后顺序，避免总是同一方先跑
+        if i % 2:
+            current = min(current, run_once(parse_lrc, corpus))
+            legacy = min(legacy, run_once(legacy_parse, corpus))
+        else:
+            legacy = min(legacy, run_once(legacy_parse, corpus))
+            current = min(current, run_once(parse_lrc, corpus))
+    total_lines = sum(text.count('\n') + 1 for text in corpus)
+    for name, best in (('legacy', legacy), ('parse_lrc', current)):
+        print(f'{name:<12} {best * 1000:9.1f} ms  {total_lines / best / 1000:8.1f} k行/秒')
+    ratio = current / legacy
+    print(f'相对旧版耗时: {ratio:.2f}x')
+    return ratio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LRC 解析微基准')
+    parser.add_argument('songs', type=int, nargs='?', default=2000, help='每组生成的歌曲数')
+    parser.add_argument('--repeat', type=int, default=15, help='交替运行的轮数')
+    parser.add_argument('--max-ratio', type=float, default=1.15,
+                        help='普通歌词上相对旧版耗时的上限，0 表示不检查')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    plain = [make_lrc(f'歌曲{i}') for i in range(args.songs)]
+    mixed = [make_song(rng) for _ in range(args.songs)]
+
+    print(f'普通歌词 {args.songs} 首，{sum(len(t) for t in plain) / 1024 / 1024:.1f} MB')
+    ratio = compare(plain, args.repeat)
+
+    # 旧版只读第一个时间标签，不解析多时间标签、逐字时间和翻译，这一组仅供参考
+    print(f'增强格式歌词 {args.songs} 首，{sum(len(t) for t in mixed) / 1024 / 1024:.1f} MB')
+    compare(mixed, max(args.repeat // 3, 1))
+
+    if args.max_ratio and ratio > args.max_ratio:
+        print(f'回归: 普通歌词解析耗时超过旧版的 {args.max_ratio} 倍')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
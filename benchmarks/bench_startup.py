@@ -0,0 +1,141 @@
+"""启动耗时基准：统计 import main 的模块导入耗时和窗口首次绘制时间
+
+用法: python benchmarks/bench_startup.py [--runs 5] [--max-import-ms 800] [--max-first-paint-ms 2000]
+使用 offscreen 平台运行，不需要显示器。中位耗时超出阈值时以非零状态退出，可作为回归检查，阈值设为 0 关闭该项检查。
+"""
+import argparse
+import os
+import re
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MAIN = os.path.join(ROOT, 'main.py')
+
+# 这些模块应当按需加载，import main 时不应该出现
+LAZY_MODULES = ('numpy', 'scipy', 'OpenGL')
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def child_env(**extra):
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    env.update(extra)
+    return env
+
+
+def run_dir():
+    """子进程的工作目录：程序按默认配置把缓存写在 ./cache，不能写进仓库"""
+    return tempfile.mkdtemp(prefix='migu-startup-')
+
+
+def measure_import():
+    """返回 (import main 的累计耗时毫秒, main 直接导入的模块耗时列表, 提前加载的大模块)"""
+    code = ('import sys, main; '
+            f'print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))')
+    cwd = run_dir()
+    try:
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd,
+                                env=child_env(), capture_output=True, text=True, timeout=60)
+    finally:
+        shutil.rmtree(cwd, ignore_errors=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'import main 失败')
+    entries = []  # (累计耗时, 缩进, 模块名)
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            entries.append((int(match.group(2)), len(match.group(3)), match.group(4)))
+    
+    # importtime 按导入完成的顺序输出，子模块排在父模块之前，缩进比父模块多两格
+    total = 0
+    imports = []
+    for i, (cumulative, indent, name) in enumerate(entries):
+        if name != 'main':
+            continue
+        total = cumulative
+        for child_cumulative, child_indent, child_name in reversed(entries[:i]):
+            if child_indent <= indent:
+                break
+            if child_indent == indent + 2:
+                imports.append((child_cumulative, child_name))
+        break
+    eager = [name for name in result.stdout.strip().split(',') if name]
+    return total / 1000, sorted(imports, reverse=True), eager
+
+
+def measure_first_paint(timeout=60):
+    """返回 (首次绘制毫秒, 后台初始化完成毫秒, 进程启动到首次绘制的墙钟毫秒)"""
+    cwd = run_dir()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.abspath(MAIN)], cwd=cwd,
+                               env=child_env(MIGU_STARTUP_PROBE='1'),
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    values = {}
+    wall = None
+    try:
+        for line in process.stdout:
+            name, _, value = line.strip().partition('=')
+            if name in ('first_paint_ms', 'deferred_ms'):
+                values[name] = float(value)
+                if name == 'first_paint_ms':
+                    wall = (time.perf_counter() - started) * 1000
+            if len(values) == 2:
+                break
+        process.wait(timeout=timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        shutil.rmtree(cwd, ignore_errors=True)
+    if 'first_paint_ms' not in values:
+        raise RuntimeError('程序没有输出首次绘制时间')
+    return values['first_paint_ms'], values.get('deferred_ms', 0.0), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时基准')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='显示 main 直接导入的模块中耗时最多的几个')
+    parser.add_argument('--max-import-ms', type=float, default=800, help='import main 的中位耗时上限，0 表示不检查')
+    parser.add_argument('--max-first-paint-ms', type=float, default=2000, help='首次绘制的中位耗时上限，0 表示不检查')
+    args = parser.parse_args()
+
+    imports, paints, deferred, walls = [], [], [], []
+    eager = []
+    imports_by_module = []
+    for _ in range(args.runs):
+        total, imports_by_module, eager = measure_import()
+        imports.append(total)
+        first_paint, ready, wall = measure_first_paint()
+        paints.append(first_paint)
+        deferred.append(ready)
+        walls.append(wall)
+
+    print(f'import main:      中位 {statistics.median(imports):8.1f} ms')
+    print(f'首次绘制:         中位 {statistics.median(paints):8.1f} ms（进程启动起 {statistics.median(walls):.1f} ms）')
+    print(f'后台初始化完成:   中位 {statistics.median(deferred):8.1f} ms')
+    print('main 中最慢的导入:')
+    for cumulative, name in imports_by_module[:args.top]:
+        print(f'  {cumulative / 1000:8.1f} ms  {name}')
+
+    failures = []
+    if eager:
+        failures.append(f'以下模块应按需加载，但在 import main 时已被加载: {", ".join(eager)}')
+    if args.max_import_ms and statistics.median(imports) > args.max_import_ms:
+        failures.append(f'import main 超出阈值 {args.max_import_ms} ms')
+    if args.max_first_paint_ms and statistics.median(paints) > args.max_first_paint_ms:
+        failures.append(f'首次绘制超出阈值 {args.max_first_paint_ms} ms')
+    for failure in failures:
+        print('回归:', failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""离线基准测试：启动本地模拟接口，在 offscreen 平台上驱动播放器测量关键路径
+
+测量搜索延迟、首次出声时间、切歌间隔、缓存命中率和频谱每帧耗时，不访问线上接口。
+
+用法: python benchmarks/run_benchmarks.py [--latency 50] [--jitter 20] [--failure-rate 0.05]
+                                          [--rounds 5] [--output report.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import QByteArray, QEventLoop
+from PyQt5.QtMultimedia import QAudioBuffer, QAudioFormat, QMediaPlayer, QMultimedia
+from PyQt5.QtWidgets import QApplication
+
+import main
+from mock_server import MockMusicServer
+
+KEYWORDS = ['周杰伦', '林俊杰', '邓紫棋', '薛之谦', '张学友', '陈奕迅', '王菲', '李荣浩']
+
+
+def summarize(samples):
+    """返回毫秒样本的中位数、p95 和样本数"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        'median_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'runs': len(ordered)
+    }
+
+
+def wait_until(app, condition, timeout=10.0):
+    """处理事件直到 condition() 为真，超时返回 False"""
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        app.processEvents(QEventLoop.AllEvents, 5)
+        time.sleep(0.001)
+    return True
+
+
+def bench_source_search(base_url, rounds):
+    """直接调用 MgMusicSource.search，只含网络和解析"""
+    source = main.MgMusicSource(base_url)
+    samples = []
+    for i in range(rounds):
+        for keyword in KEYWORDS:
+            started = time.perf_counter()
+            try:
+                source.search(f'{keyword}{i}')
+            except Exception as e:
+                print(f'搜索失败：{str(e)}')
+                continue
+            samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def bench_ui_search(app, player, rounds):
+    """从发起搜索到列表显示结果，第二次搜索同一关键词应直接命中查询缓存"""
+    queries = [f'{keyword} {i}' for i in range(rounds) for keyword in KEYWORDS]
+    result = {}
+    for phase in ('cold', 'warm'):
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            player.start_search(query)
+            shown = lambda: player.song_model.keyword == query and player.song_model.rowCount() > 0
+            if wait_until(app, shown):
+                samples.append((time.perf_counter() - started) * 1000)
+        result[phase] = summarize(samples)
+    return result
+
+
+def play_and_wait(app, player, row, timeout=15.0):
+    """返回 (获取详情耗时, 开始出声耗时)，没有多媒体后端时出声耗时为 None"""
+    key = player.song_info(row)[0]
+    started = time.perf_counter()
+    player.play_row(row)
+    detail_ms = audio_ms = None
+    if wait_until(app, lambda: player.current_song_key == key, timeout):
+        detail_ms = (time.perf_counter() - started) * 1000
+        if player.player.availability() == QMultimedia.Available:
+            if wait_until(app, lambda: player.player.position() > 0, timeout):
+                audio_ms = (time.perf_counter() - started) * 1000
+    return detail_ms, audio_ms
+
+
+def bench_first_audio(app, player, rounds):
+    """首次播放与再次播放（详情和音频都已缓存）的对比"""
+    player.start_search('首播测试')
+    wait_until(app, lambda: player.song_model.keyword == '首播测试' and player.song_model.rowCount() > 0)
+    result = {'cold_detail': [], 'cold_audio': [], 'warm_detail': [], 'warm_audio': []}
+    for row in range(min(rounds, player.song_model.rowCount())):
+        key = player.song_info(row)[0]
+        for phase in ('cold', 'warm'):
+            detail_ms, audio_ms = play_and_wait(app, player, row)
+            if detail_ms is not None:
+                result[f'{phase}_detail'].append(detail_ms)
+            if audio_ms is not None:
+                result[f'{phase}_audio'].append(audio_ms)
+            player.stop_music()
+            if phase == 'cold':
+                # 等后台把音频写入缓存，再测再次播放
+                wait_until(app, lambda: player.audio_cache.get(key) is not None, 30)
+    return {name: summarize(samples) for name, samples in result.items()}
+
+
+def bench_transition(app, player, rounds):
+    """顺序播放时上一首结束到下一首开始出声的间隔"""
+    if player.player.availability() != QMultimedia.Available:
+        return None
+    ended = []
+    player.player.mediaStatusChanged.connect(
+        lambda status: ended.append(time.perf_counter()) if status == QMediaPlayer.EndOfMedia else None)
+    player.play_mode = 'sequence'
+    gaps = []
+    for row in range(min(rounds, player.song_model.rowCount() - 1)):
+        if play_and_wait(app, player, row)[1] is None:
+            continue
+        wait_until(app, lambda: player.player.duration() > 0)
+        ended.clear()
+        player.player.setPosition(max(player.player.duration() - 300, 0))
+        if not wait_until(app, lambda: bool(ended)):
+            continue
+        if wait_until(app, lambda: player.current_row() == row + 1 and player.player.position() > 0):
+            gaps.append((time.perf_counter() - ended[0]) * 1000)
+    player.stop_music()
+    return summarize(gaps)
+
+
+def make_audio_buffer(frames=4096, sample_rate=44100):
+    """生成 16 位立体声正弦波缓冲区"""
+    fmt = QAudioFormat()
+    fmt.setSampleRate(sample_rate)
+    fmt.setChannelCount(2)
+    fmt.setSampleSize(16)
+    fmt.setSampleType(QAudioFormat.SignedInt)
+    fmt.setByteOrder(QAudioFormat.LittleEndian)
+    fmt.setCodec('audio/pcm')
+    t = np.arange(frames) / sample_rate
+    wave = (np.sin(2 * np.pi * 440 * t) + 0.5 * np.sin(2 * np.pi * 3000 * t)) * 12000
+    data = np.repeat(wave.astype(np.int16)[:, None], 2, axis=1).tobytes()
+    return QAudioBuffer(QByteArray(data), fmt)
+
+
+def bench_visualizer(app, player, iterations=500):
+    """频谱分析耗时，以及能创建 OpenGL 上下文时的每帧绘制耗时"""
+    buffer = make_audio_buffer()
+    analyzer = main.SpectrumAnalyzer()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        analyzer.process(buffer)
+        samples.append((time.perf_counter() - started) * 1000)
+    result = {'analyze': summarize(samples), 'paint': None}
+
+    visualizer = player.visualizer
+    if visualizer is None or not visualizer.isValid():
+        return result
+    samples = []
+    for _ in range(iterations):
+        visualizer.update_spectrum(buffer)
+        started = time.perf_counter()
+        visualizer.updateGL()  # 同步调用 paintGL
+        samples.append((time.perf_counter() - started) * 1000)
+    result['paint'] = summarize(samples)
+    return result
+
+
+def main_entry():
+    parser = argparse.ArgumentParser(description='离线基准测试')
+    parser.add_argument('--latency', type=float, default=30, help='模拟接口每个请求的固定延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=10, help='额外随机延迟上限（毫秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='模拟接口返回 503 的概率')
+    parser.add_argument('--song-seconds', type=float, default=3, help='合成音频时长（秒）')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--output', help='把 JSON 报告写入该文件')
+    args = parser.parse_args()
+
+    server = MockMusicServer(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                             failure_rate=args.failure_rate, song_seconds=args.song_seconds, seed=1)
+    server.start()
+    cache_dir = tempfile.mkdtemp(prefix='migu-bench-')
+    main.CONFIG.update({
+        'api_base': server.base_url,
+        'cache_path': cache_dir,
+        'download_path': os.path.join(cache_dir, 'downloads'),
+    })
+
+    app = QApplication(sys.argv)
+    player = main.MusicPlayer()
+    try:
+        wait_until(app, lambda: player.audio_cache is not None)
+        report = {
+            'mock': {'latency_ms': args.latency, 'jitter_ms': args.jitter, 'failure_rate': args.failure_rate},
+            'source_search': bench_source_search(server.base_url, args.rounds),
+            'ui_search': bench_ui_search(app, player, args.rounds),
+            'first_audio': bench_first_audio(app, player, args.rounds),
+            'transition_gap': bench_transition(app, player, args.rounds),
+            'visualizer': bench_visualizer(app, player),
+            'cache': player.cache.stats(),
+            'audio_cache_entries': len(player.audio_cache.index),
+            'server': {
+                'requests': server.state.requests,
+                'failures': server.state.failures,
+                'bytes_sent': server.state.bytes_sent
+            }
+        }
+    finally:
+        player.close()
+        server.stop()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_entry())
@@ -1,37 +1,71 @@
+import time
+START_TIME = time.perf_counter()  # 用于统计启动耗时
 import sys
-import random
+
+if __name__ == '__main__' and any(arg == '--batch' or arg.startswith('--batch=') for arg in sys.argv[1:]):
+    # 命令行批量下载不需要界面，在导入 PyQt5 之前分派，没有显示器和音频库的服务器也能运行
+    from music_core import run_batch
+    sys.exit(run_batch(sys.argv[1:]))
+
+import os
+import json
+import colorsys
+import html
+from bisect import bisect_right
+import hashlib
+import importlib
+import traceback
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QPushButton, QListWidget, QListWidgetItem, QLabel, 
-                            QFileDialog, QMessageBox, QLineEdit, QSlider, QScrollArea)
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent, QAudioProbe
-from PyQt5.QtCore import QUrl, Qt, QThread, pyqtSignal, QTimer, QPropertyAnimation, QEasingCurve, QPoint, QSize, QRect, pyqtProperty, QTimerEvent
-from PyQt5.QtGui import QPixmap, QIcon, QPainter, QLinearGradient, QColor, QPalette, QTransform
+                            QHBoxLayout, QPushButton, QListView, QLabel, 
+                            QFileDialog, QMessageBox, QLineEdit, QSlider, QScrollArea, QShortcut)
+from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent, QAudioProbe, QAudioFormat
+from PyQt5.QtCore import QObject, QAbstractListModel, QModelIndex, QBuffer, QByteArray, QIODevice, QUrl, Qt, pyqtSignal, QTimer, QPropertyAnimation, QEasingCurve, QPoint, QSize, QRect, pyqtProperty, QTimerEvent, QEvent
+from PyQt5.QtGui import QPixmap, QImage, QKeySequence, QIcon, QPainter, QLinearGradient, QColor, QPalette, QTransform
 from PyQt5.QtOpenGL import QGLWidget
-import requests
-from io import BytesIO
 import threading
 import queue
-import time
+from collections import OrderedDict
 from functools import partial
-import urllib3
-import warnings
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
-import numpy as np
-from scipy.fft import fft
 import struct
-from OpenGL.GL import *
-from OpenGL.GLU import *
+from music_core import (CONFIG, tracer, normalize_text, detail_expiry, MgMusicSource, CancelToken,
+                        DownloadCancelled, download_file, parse_lrc)
+
+try:
+    import psutil  # 可选依赖，用于检测是否使用电池供电
+except ImportError:
+    psutil = None
+
+class LazyModule:
+    """首次访问属性时才导入的模块，用于推迟加载依赖图形环境或体积较大的库"""
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return getattr(module, attr)
+
+# 频谱分析和绘制用到的库较大，等可视化组件创建时才加载
+np = LazyModule('numpy')
+scipy_fft = LazyModule('scipy.fft')
+gl = LazyModule('OpenGL.GL')
 
-# 禁用 SSL 警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-warnings.simplefilter('ignore', InsecureRequestWarning)
+# 启动基准测试用：设置后首次绘制时输出耗时，后台初始化完成后退出
+STARTUP_PROBE = bool(os.environ.get('MIGU_STARTUP_PROBE'))
 
 # 添加自定义的旋转标签类
 class RotateLabel(QLabel):
+    """旋转显示封面，每个角度的画面只渲染一次，之后直接贴图"""
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._rotation = 0
         self._pixmap = None
+        self._frames = {}  # 帧序号 -> 旋转好的画面
+        self._frame_count = 1
+        self._frame_index = 0
 
     @pyqtProperty(float)
     def rotation(self):
@@ -40,44 +74,139 @@ class RotateLabel(QLabel):
     @rotation.setter
     def rotation(self, angle):
         self._rotation = angle
-        self.update()
+        # 角度落在同一帧内时不需要重绘
+        index = int(angle % 360 / 360 * self._frame_count)
+        if index != self._frame_index:
+            self._frame_index = index
+            self.update()
 
     def setPixmap(self, pixmap):
         self._pixmap = pixmap
+        self._frames = {}  # 换封面时释放旧的旋转帧
+        
+        # 按内存上限确定实际的角度分辨率
+        frame_bytes = max(pixmap.width() * pixmap.height() * 4, 1)
+        max_frames = max(int(CONFIG['cover_sprite_budget'] * 1024 * 1024 // frame_bytes), 1)
+        self._frame_count = max(min(int(360 / CONFIG['cover_angle_step']), max_frames), 1)
+        self._frame_index = int(self._rotation % 360 / 360 * self._frame_count)
         super().setPixmap(self._pixmap)
 
-    def paintEvent(self, event):
-        if self._pixmap:
-            painter = QPainter(self)
+    def frame(self, index):
+        frame = self._frames.get(index)
+        if frame is None:
+            frame = QPixmap(self._pixmap.size())
+            frame.fill(Qt.transparent)
+            painter = QPainter(frame)
             painter.setRenderHint(QPainter.Antialiasing)
             painter.setRenderHint(QPainter.SmoothPixmapTransform)
             
             # 设置旋转中心点
-            center = self.rect().center()
+            center = frame.rect().center()
             painter.translate(center)
-            painter.rotate(self._rotation)
+            painter.rotate(index * 360 / self._frame_count)
             painter.translate(-center)
-            
-            # 绘制图片
-            super().paintEvent(event)
+            painter.drawPixmap(0, 0, self._pixmap)
+            painter.end()
+            self._frames[index] = frame
+        return frame
+
+    def paintEvent(self, event):
+        if self._pixmap:
+            frame = self.frame(self._frame_index)
+            painter = QPainter(self)
+            painter.drawPixmap((self.width() - frame.width()) // 2,
+                               (self.height() - frame.height()) // 2, frame)
         else:
             super().paintEvent(event)
 
+class LRUStore:
+    """线程安全的 LRU 存储，按调用方给出的近似字节数控制容量"""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()  # 键 -> (值, 字节数)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)  # 命中后移到最近使用的一端
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size):
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self.items[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.items.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            item = self.items.pop(key, None)
+            if item is not None:
+                self.total_bytes -= item[1]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.items),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
 class Cache:
-    def __init__(self):
-        self.lyrics_cache = {}
-        self.cover_cache = {}
-        self.max_size = 20  # 最大缓存数量
+    def __init__(self, lyrics_bytes=4 * 1024 * 1024, cover_bytes=32 * 1024 * 1024, detail_bytes=256 * 1024,
+                 search_bytes=1024 * 1024):
+        self.lyrics_cache = LRUStore(lyrics_bytes)
+        self.cover_cache = LRUStore(cover_bytes)
+        self.detail_cache = LRUStore(detail_bytes)
+        self.search_cache = LRUStore(search_bytes)
+
+    def add_search(self, query, songs):
+        """缓存第一页搜索结果，query 为规范化后的关键词"""
+        size = sum(len(title) + len(singer) for title, singer, _ in songs) * 2 + 64
+        self.search_cache.put(query, (songs, time.time()), size)
+
+    def get_search(self, query):
+        """返回 (歌曲列表, 获取时间)"""
+        return self.search_cache.get(query)
+
+    def add_detail(self, key, entry):
+        """entry 为 {'data': 歌曲详情, 'expires': 过期时间}"""
+        self.detail_cache.put(key, entry, len(json.dumps(entry['data'])))
+
+    def get_detail(self, key):
+        entry = self.detail_cache.get(key)
+        if entry is not None and entry['expires'] < time.time():
+            self.detail_cache.discard(key)
+            return None
+        return entry
+
+    def remove_detail(self, key):
+        self.detail_cache.discard(key)
 
     def add_lyrics(self, url, lyrics):
-        if len(self.lyrics_cache) >= self.max_size:
-            self.lyrics_cache.pop(next(iter(self.lyrics_cache)))
-        self.lyrics_cache[url] = lyrics
+        self.lyrics_cache.put(url, lyrics, lyrics.nbytes())
 
-    def add_cover(self, url, pixmap):
-        if len(self.cover_cache) >= self.max_size:
-            self.cover_cache.pop(next(iter(self.cover_cache)))
-        self.cover_cache[url] = pixmap
+    def add_cover(self, url, image):
+        size = image.width() * image.height() * max(image.depth(), 8) // 8
+        self.cover_cache.put(url, image, size)
 
     def get_lyrics(self, url):
         return self.lyrics_cache.get(url)
@@ -85,189 +214,1426 @@ class Cache:
     def get_cover(self, url):
         return self.cover_cache.get(url)
 
-class AsyncLoader(QThread):
-    lyrics_loaded = pyqtSignal(str, list)  # 歌词加载信号
-    cover_loaded = pyqtSignal(str, QPixmap)  # 封面加载信号
-    
-    def __init__(self, cache):
-        super().__init__()
-        self.cache = cache
-        self.queue = queue.Queue()
-        self.running = True
+    def stats(self):
+        return {
+            'lyrics': self.lyrics_cache.stats(),
+            'cover': self.cover_cache.stats(),
+            'detail': self.detail_cache.stats(),
+            'search': self.search_cache.stats()
+        }
 
-    def parse_lyrics(self, lrc_text):  # 添加歌词解析方法
-        lyrics = []
-        lines = lrc_text.split('\n')
-        for line in lines:
-            if '[' in line and ']' in line:
-                time_str = line[line.find('[') + 1:line.find(']')]
+class DiskCache:
+    """磁盘缓存：内容按哈希去重存储，总大小超过 max_cache_size（MB）时淘汰最久未访问的条目"""
+    FLUSH_INTERVAL_MS = 30000  # 索引定时写入磁盘的间隔，退出时再写一次
+
+    def __init__(self, cache_path=None, max_size=None):
+        self.cache_path = cache_path or CONFIG['cache_path']
+        self.max_bytes = int((max_size or CONFIG['max_cache_size']) * 1024 * 1024)
+        self.blob_path = os.path.join(self.cache_path, 'blobs')
+        self.index_path = os.path.join(self.cache_path, 'index.json')
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # 同一时间只有一个线程写索引文件
+        self.index = {}  # 缓存键 -> {'hash', 'size', 'expires', 'atime'}
+        self.refs = {}  # 内容哈希 -> 引用次数
+        self.total_size = 0
+        self.dirty = False
+        try:
+            os.makedirs(self.blob_path, exist_ok=True)
+            self.load_index()
+        except OSError as e:
+            print(f"初始化磁盘缓存失败：{str(e)}")
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        except (OSError, ValueError) as e:
+            print(f"缓存索引损坏，已重建：{str(e)}")
+            index = {}
+        for key, entry in index.items():
+            if os.path.exists(self.blob_file(entry['hash'])):
+                self.add_entry(key, entry)
+        
+        # 清理索引之外的残留文件（例如写入途中程序退出）
+        for name in os.listdir(self.blob_path):
+            if name not in self.refs:
                 try:
-                    if '.' in time_str:
-                        m, s = time_str.split(':')
-                        s, ms = s.split('.')
-                        time = int(m) * 60000 + int(s) * 1000 + int(ms) * 10
-                    else:
-                        m, s = time_str.split(':')
-                        time = int(m) * 60000 + int(s) * 1000
-                    text = line[line.find(']') + 1:].strip()
-                    if text:
-                        lyrics.append((time, text))
-                except:
-                    continue
-        return sorted(lyrics)
+                    os.remove(os.path.join(self.blob_path, name))
+                except OSError:
+                    pass
+
+    def save_index(self):
+        # 锁内只做序列化，写文件放在锁外，不阻塞其他线程读写缓存
+        with self.lock:
+            if not self.dirty:
+                return
+            data = json.dumps(self.index)
+            self.dirty = False
+        with self.save_lock:
+            tmp_path = self.index_path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.index_path)
+            except OSError:
+                with self.lock:
+                    self.dirty = True
+                raise
+
+    def blob_file(self, digest):
+        return os.path.join(self.blob_path, digest)
+
+    def add_entry(self, key, entry):
+        self.index[key] = entry
+        if entry['hash'] not in self.refs:
+            self.refs[entry['hash']] = 0
+            self.total_size += entry['size']
+        self.refs[entry['hash']] += 1
+
+    def remove_entry(self, key):
+        entry = self.index.pop(key)
+        self.refs[entry['hash']] -= 1
+        if self.refs[entry['hash']] == 0:
+            # 没有其他条目引用该内容时删除文件
+            del self.refs[entry['hash']]
+            self.total_size -= entry['size']
+            try:
+                os.remove(self.blob_file(entry['hash']))
+            except OSError:
+                pass
+        self.dirty = True
+
+    def get(self, kind, url):
+        key = f'{kind}:{url}'
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] and entry['expires'] < time.time():
+                self.remove_entry(key)
+                return None
+
+        # 读文件和校验哈希不持有锁，多个工作线程可以同时读取
+        try:
+            with open(self.blob_file(entry['hash']), 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = None
+        valid = data is not None and hashlib.sha256(data).hexdigest() == entry['hash']
+
+        with self.lock:
+            if self.index.get(key) is not entry:
+                # 读取期间条目被替换或淘汰
+                return data if valid else None
+            if not valid:
+                # 文件丢失或损坏，丢弃后重新下载
+                self.remove_entry(key)
+                return None
+            entry['atime'] = time.time()
+            self.dirty = True
+            return data
+
+    def delete(self, kind, url):
+        key = f'{kind}:{url}'
+        with self.lock:
+            if key in self.index:
+                self.remove_entry(key)
+
+    def put(self, kind, url, data, ttl=None):
+        key = f'{kind}:{url}'
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            if digest not in self.refs:
+                self.write_blob(digest, data)
+            with self.lock:
+                if digest not in self.refs and not os.path.exists(self.blob_file(digest)):
+                    # 写入后同一内容的旧条目被淘汰，文件已被删除
+                    self.write_blob(digest, data)
+                if key in self.index:
+                    self.remove_entry(key)
+                self.add_entry(key, {
+                    'hash': digest,
+                    'size': len(data),
+                    'expires': time.time() + ttl if ttl else 0,
+                    'atime': time.time()
+                })
+                self.evict()
+                self.dirty = True  # 索引由 flush 定时写入磁盘
+        except OSError as e:
+            print(f"写入磁盘缓存失败：{str(e)}")
+
+    def write_blob(self, digest, data):
+        # 临时文件名带线程号，两个线程同时写入同一内容时互不覆盖
+        tmp_path = f'{self.blob_file(digest)}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.blob_file(digest))
+
+    def evict(self):
+        if self.total_size <= self.max_bytes:
+            return
+        for key in sorted(self.index, key=lambda k: self.index[k]['atime']):
+            self.remove_entry(key)
+            if self.total_size <= self.max_bytes:
+                break
+
+    def flush(self):
+        try:
+            self.save_index()
+        except OSError as e:
+            print(f"保存缓存索引失败：{str(e)}")
+
+WORKER_JOIN_TIMEOUT = 1.5  # 退出时最多等待工作线程的秒数
+
+def join_workers(workers, timeout):
+    """在 timeout 秒内等待所有线程结束，仍卡在网络请求上的守护线程随进程退出"""
+    deadline = time.monotonic() + timeout
+    for worker in workers:
+        if worker.is_alive():  # 窗口在首次绘制前关闭时线程还没有启动
+            worker.join(max(deadline - time.monotonic(), 0))
+
+class LoadTask:
+    def __init__(self, task_type, url, owner, priority, payload=None):
+        self.task_type = task_type
+        self.url = url
+        self.payload = payload  # 任务附带的参数，例如详情任务的 (歌名, 序号)
+        self.owner = owner  # 任务所属的歌曲，切歌后用于取消
+        self.priority = priority
+        self.cancelled = False
+        self.started = False
+        self.created = time.perf_counter()  # 用于统计排队时间
+
+class LoaderWorker(threading.Thread):
+    # 守护线程：网络请求卡住时不阻止程序退出
+    def __init__(self, loader):
+        super().__init__(name='loader', daemon=True)
+        self.loader = loader
 
     def run(self):
-        while self.running:
+        while self.loader.running:
             try:
-                task = self.queue.get(timeout=1)
-                if task:
-                    task_type, url = task
-                    if task_type == 'lyrics':
-                        self.load_lyrics(url)
-                    elif task_type == 'cover':
-                        self.load_cover(url)
+                _, _, task = self.loader.queue.get(timeout=1)
             except queue.Empty:
                 continue
+            self.loader.run_task(task)
+
+class AsyncLoader(QObject):
+    lyrics_loaded = pyqtSignal(str, object)  # 歌词加载信号
+    cover_loaded = pyqtSignal(str, QImage)  # 封面加载信号（已处理成圆形）
+    detail_loaded = pyqtSignal(str, dict)  # 歌曲详情加载信号
+    detail_failed = pyqtSignal(str, str)  # 歌曲详情加载失败信号
+    
+    # 数值越小越先执行，预加载任务排在最后
+    TASK_PRIORITIES = {'detail': 0, 'lyrics': 1, 'cover': 2}
+    PREFETCH_PRIORITY = 10
+    
+    def __init__(self, cache, disk_cache=None, workers=None, source=None):
+        super().__init__()
+        self.cache = cache
+        self.source = source or MgMusicSource()
+        self.disk_cache = disk_cache
+        self.queue = queue.PriorityQueue()
+        self.pending = {}  # (任务类型, 地址) -> 排队或执行中的任务，用于去重
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.running = True
+        self.workers = [LoaderWorker(self) for _ in range(workers or CONFIG['loader_workers'])]
+
+    def parse_lyrics(self, lrc_text):  # 添加歌词解析方法
+        with tracer.span('parse_lrc', 'parse'):
+            return parse_lrc(lrc_text)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def run_task(self, task):
+        with self.lock:
+            if task.cancelled:
+                return
+            task.started = True
+        started = time.perf_counter()
+        tracer.record('queue_wait', task.created, started - task.created, 'loader')
+        try:
+            with tracer.span(task.task_type, 'loader'):
+                if task.task_type == 'detail':
+                    self.load_detail(task.url, *task.payload)
+                elif task.task_type == 'lyrics':
+                    self.load_lyrics(task.url)
+                elif task.task_type == 'cover':
+                    self.load_cover(task.url)
+        finally:
+            with self.lock:
+                key = (task.task_type, task.url)
+                if self.pending.get(key) is task:
+                    del self.pending[key]
+
+    def cached_detail(self, key):
+        # 先查内存再查磁盘，播放地址过期的条目视为未命中
+        entry = self.cache.get_detail(key)
+        if entry is None and self.disk_cache:
+            cached = self.disk_cache.get('detail', key)
+            if cached is not None:
+                entry = json.loads(cached.decode('utf-8'))
+                self.cache.add_detail(key, entry)
+        return entry['data'] if entry else None
+
+    def store_detail(self, key, song_data):
+        entry = {'data': song_data, 'expires': detail_expiry(song_data)}
+        self.cache.add_detail(key, entry)
+        if self.disk_cache:
+            ttl = max(entry['expires'] - time.time(), 1)
+            self.disk_cache.put('detail', key, json.dumps(entry).encode('utf-8'), ttl=ttl)
+
+    def invalidate_detail(self, key):
+        """播放地址失效（如 403）时丢弃缓存的详情，下次重新获取"""
+        self.cache.remove_detail(key)
+        if self.disk_cache:
+            self.disk_cache.delete('detail', key)
+
+    def load_detail(self, key, title, index):
+        song_data = self.cached_detail(key)
+        if song_data is not None:
+            self.detail_loaded.emit(key, song_data)
+            return
+        
+        try:
+            song_data = self.source.resolve(title, index)
+            self.store_detail(key, song_data)
+            self.detail_loaded.emit(key, song_data)
+        except Exception as e:
+            self.detail_failed.emit(key, str(e))
 
     def load_lyrics(self, url):
+        # 先查内存缓存，再查磁盘缓存
+        lyrics = self.cache.get_lyrics(url)
+        if lyrics is None and self.disk_cache:
+            data = self.disk_cache.get('lyrics', url)
+            if data is not None:
+                lyrics = self.parse_lyrics(data.decode('utf-8'))
+                self.cache.add_lyrics(url, lyrics)
+        if lyrics is not None:
+            self.lyrics_loaded.emit(url, lyrics)
+            return
+        
         try:
-            # 添加重试机制和超时设置
-            session = requests.Session()
-            retries = 3
-            while retries > 0:
-                try:
-                    response = session.get(url, timeout=5, verify=False)  # 禁用SSL验证
-                    if response.status_code == 200:
-                        lyrics = self.parse_lyrics(response.text)
-                        self.cache.add_lyrics(url, lyrics)
-                        self.lyrics_loaded.emit(url, lyrics)
-                        break
-                except requests.RequestException:
-                    retries -= 1
-                    if retries == 0:
-                        print(f"加载歌词失败，已重试3次：{url}")
-                    time.sleep(1)  # 等待1秒后重试
+            # 重试和退避由共享会话负责
+            lrc_text = self.source.fetch_lyrics(url)
+            lyrics = self.parse_lyrics(lrc_text)
+            self.cache.add_lyrics(url, lyrics)
+            if self.disk_cache:
+                self.disk_cache.put('lyrics', url, lrc_text.encode('utf-8'))
+            self.lyrics_loaded.emit(url, lyrics)
         except Exception as e:
             print(f"加载歌词失败：{str(e)}")
 
     def load_cover(self, url):
+        # 内存和磁盘中缓存的都是处理好的圆形封面
+        image = self.cache.get_cover(url)
+        if image is None and self.disk_cache:
+            data = self.disk_cache.get('round_cover', url)
+            if data is not None:
+                image = QImage.fromData(data)
+                if image.isNull():
+                    image = None
+                else:
+                    self.cache.add_cover(url, image)
+        if image is not None:
+            self.cover_loaded.emit(url, image)
+            return
+        
         try:
-            session = requests.Session()
-            retries = 3
-            while retries > 0:
-                try:
-                    response = session.get(url, timeout=5, verify=False)
-                    if response.status_code == 200:
-                        image_data = BytesIO(response.content)
-                        pixmap = QPixmap()
-                        pixmap.loadFromData(image_data.getvalue())
-                        scaled_pixmap = pixmap.scaled(300, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                        self.cache.add_cover(url, scaled_pixmap)
-                        self.cover_loaded.emit(url, scaled_pixmap)
-                        break
-                except requests.RequestException:
-                    retries -= 1
-                    if retries == 0:
-                        print(f"加载封面失败，已重试3次：{url}")
-                    time.sleep(1)  # 等待1秒后重试
+            data = self.source.fetch_cover(url)
+            with tracer.span('decode_cover', 'decode'):
+                image = self.decode_cover(data)
+            self.cache.add_cover(url, image)
+            if self.disk_cache:
+                self.disk_cache.put('round_cover', url, self.encode_png(image))
+            self.cover_loaded.emit(url, image)
         except Exception as e:
-            print(f"加载封面失：{str(e)}")
+            print(f"加载封面失败：{str(e)}")
 
-    def add_task(self, task_type, url):
-        self.queue.put((task_type, url))
+    def decode_cover(self, data, size=300):
+        """解码、缩放一次、居中裁剪并加上圆形遮罩，全部在工作线程中用 QImage 完成"""
+        image = QImage.fromData(data)
+        if image.isNull():
+            raise Exception("封面图片解码失败")
+        image = image.scaled(size, size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+        
+        # 居中裁剪
+        x = (image.width() - size) // 2
+        y = (image.height() - size) // 2
+        image = image.copy(x, y, size, size)
+        
+        # 应用圆形遮罩
+        result = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+        result.fill(Qt.transparent)
+        painter = QPainter(result)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setBrush(Qt.white)
+        painter.setPen(Qt.NoPen)
+        painter.drawEllipse(0, 0, size, size)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+        painter.drawImage(0, 0, image)
+        painter.end()
+        return result
+
+    def encode_png(self, image):
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, 'PNG')
+        buffer.close()
+        return bytes(data)
+
+    def add_task(self, task_type, url, owner=None, prefetch=False, payload=None):
+        priority = self.TASK_PRIORITIES[task_type] + (self.PREFETCH_PRIORITY if prefetch else 0)
+        key = (task_type, url)
+        with self.lock:
+            existing = self.pending.get(key)
+            if existing is not None:
+                # 相同地址已在排队或下载中，不重复请求
+                existing.owner = owner
+                if existing.started or existing.priority <= priority:
+                    return
+                existing.cancelled = True  # 以更高优先级重新排队
+            task = LoadTask(task_type, url, owner, priority, payload)
+            self.pending[key] = task
+            self.sequence += 1
+            self.queue.put((priority, self.sequence, task))
+
+    def cancel_stale(self, keep_owners):
+        """取消不属于 keep_owners 中歌曲、且尚未开始的任务"""
+        with self.lock:
+            for key, task in list(self.pending.items()):
+                if not task.started and task.owner not in keep_owners:
+                    task.cancelled = True
+                    del self.pending[key]
 
     def stop(self):
         self.running = False
 
+    def wait(self, timeout=WORKER_JOIN_TIMEOUT):
+        join_workers(self.workers, timeout)
+
+class SearchWorker(QObject):
+    """每次搜索在单独的守护线程中进行，接口卡住时新的搜索不用排在旧搜索后面，旧搜索的结果直接丢弃"""
+    search_finished = pyqtSignal(int, str, int, list)  # 搜索完成信号（请求编号, 关键词, 页码, 歌曲列表）
+    search_failed = pyqtSignal(int, str, int, str)  # 搜索失败信号（请求编号, 关键词, 页码, 错误信息）
+
+    def __init__(self, source=None):
+        super().__init__()
+        self.source = source or MgMusicSource()
+        self.search_id = 0
+        self.lock = threading.Lock()
+        self.cancel_event = CancelToken()
+
+    def cancel(self):
+        """取消正在进行的搜索，之后返回的旧结果都会被视为过期"""
+        with self.lock:
+            self.search_id += 1
+            self.cancel_event.set()  # 关闭旧搜索正在使用的连接
+            self.cancel_event = CancelToken()
+            return self.search_id, self.cancel_event
+
+    def search(self, keyword):
+        """提交新的搜索，正在进行的旧搜索会被取消"""
+        search_id, cancel_event = self.cancel()
+        self.submit(search_id, keyword, 1, cancel_event)
+        return search_id
+
+    def fetch_page(self, keyword, page):
+        """在当前搜索的基础上加载后续页，发起新搜索时一并取消"""
+        with self.lock:
+            search_id, cancel_event = self.search_id, self.cancel_event
+        self.submit(search_id, keyword, page, cancel_event)
+
+    def submit(self, search_id, keyword, page, cancel_event):
+        # 每次搜索最多 api_timeout 秒；用守护线程，旧搜索未结束也不影响新的搜索和程序退出
+        thread = threading.Thread(target=self.run_search, args=(search_id, keyword, page, cancel_event),
+                                  name='search', daemon=True)
+        thread.start()
+
+    def is_stale(self, search_id):
+        return search_id != self.search_id
+
+    def run_search(self, search_id, keyword, page, cancel_event):
+        try:
+            with tracer.span('search', 'network'):
+                songs = self.source.search(keyword, page, cancel_event=cancel_event)
+        except Exception as e:
+            if not self.is_stale(search_id):
+                self.search_failed.emit(search_id, keyword, page, f'搜索出错：{str(e)}')
+            return
+        if songs is not None and not self.is_stale(search_id):
+            self.search_finished.emit(search_id, keyword, page, songs)
+
+    def stop(self):
+        self.cancel()
+
+class RecommendWorker(QObject):
+    """并发搜索多位歌手，合并去重后作为推荐列表；每位歌手一个守护线程，卡住时不影响退出"""
+    recommend_loaded = pyqtSignal(list)  # 推荐歌曲列表
+    recommend_failed = pyqtSignal(str)
+
+    KEYWORDS = ['周杰伦', '林俊杰', '邓紫棋', '薛之谦', '张学友']
+
+    def __init__(self, source=None, keywords=None):
+        super().__init__()
+        self.source = source or MgMusicSource()
+        self.keywords = keywords or self.KEYWORDS
+        self.cancel_event = CancelToken()
+        self.results = [None] * len(self.keywords)
+        self.remaining = len(self.keywords)
+        self.lock = threading.Lock()
+
+    def start(self):
+        for i, keyword in enumerate(self.keywords):
+            threading.Thread(target=self.search_one, args=(i, keyword), name='recommend', daemon=True).start()
+
+    def search_one(self, i, keyword):
+        try:
+            songs = self.source.search(keyword, cancel_event=self.cancel_event) or []
+        except Exception as e:
+            print(f"加载推荐音乐失败（{keyword}）：{str(e)}")
+            songs = None
+        with self.lock:
+            self.results[i] = songs
+            self.remaining -= 1
+            finished = self.remaining == 0
+        if finished:
+            self.finish(self.results)
+
+    def finish(self, results):
+        if self.cancel_event.is_set():
+            return
+        if all(songs is None for songs in results):
+            self.recommend_failed.emit('所有歌手的搜索都失败了')
+            return
+        self.recommend_loaded.emit(merge_songs([songs or [] for songs in results]))
+
+    def stop(self):
+        self.cancel_event.set()
+
+def merge_songs(song_lists):
+    """轮流从每个列表取歌，按 (歌名, 歌手) 去重"""
+    merged = []
+    seen = set()
+    for row in range(max((len(songs) for songs in song_lists), default=0)):
+        for songs in song_lists:
+            if row < len(songs) and songs[row][:2] not in seen:
+                seen.add(songs[row][:2])
+                merged.append(songs[row])
+    return merged
+
+class DownloadTask:
+    def __init__(self, task_id, url, save_path):
+        self.task_id = task_id
+        self.url = url
+        self.save_path = save_path
+        self.cancel_event = threading.Event()
+
+class DownloadWorker(threading.Thread):
+    # 守护线程：退出时未完成的下载保留 .part 文件，下次续传
+    def __init__(self, manager):
+        super().__init__(name='download', daemon=True)
+        self.manager = manager
+
+    def run(self):
+        while self.manager.running:
+            try:
+                task = self.manager.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            self.manager.run_task(task)
+
+class DownloadManager(QObject):
+    download_progress = pyqtSignal(int, int, int)  # 下载进度信号（任务编号, 已下载字节, 总字节）
+    download_finished = pyqtSignal(int, str)  # 下载完成信号（任务编号, 保存路径）
+    download_failed = pyqtSignal(int, str)  # 下载失败信号（任务编号, 错误信息）
+    download_cancelled = pyqtSignal(int)  # 下载取消信号
+
+    def __init__(self, concurrency=None):
+        super().__init__()
+        self.concurrency = concurrency or CONFIG['download_concurrency']
+        self.queue = queue.Queue()
+        self.tasks = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.running = True
+        self.workers = [DownloadWorker(self) for _ in range(self.concurrency)]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def add_download(self, url, save_path):
+        with self.lock:
+            self.next_id += 1
+            task = DownloadTask(self.next_id, url, save_path)
+            self.tasks[task.task_id] = task
+        self.queue.put(task)
+        return task.task_id
+
+    def find_task(self, url):
+        """返回该地址正在排队或下载中的任务编号"""
+        with self.lock:
+            for task in self.tasks.values():
+                if task.url == url:
+                    return task.task_id
+        return None
+
+    def cancel(self, task_id):
+        with self.lock:
+            task = self.tasks.get(task_id)
+        if task:
+            task.cancel_event.set()
+
+    def run_task(self, task):
+        try:
+            if task.cancel_event.is_set():
+                raise DownloadCancelled()
+            download_file(task.url, task.save_path, task.cancel_event,
+                          partial(self.download_progress.emit, task.task_id))
+            self.download_finished.emit(task.task_id, task.save_path)
+        except DownloadCancelled:
+            # 保留 .part 文件，下次下载同一文件时可以续传
+            self.download_cancelled.emit(task.task_id)
+        except Exception as e:
+            self.download_failed.emit(task.task_id, str(e))
+        finally:
+            with self.lock:
+                self.tasks.pop(task.task_id, None)
+
+    def stop(self):
+        self.running = False
+        with self.lock:
+            for task in self.tasks.values():
+                task.cancel_event.set()
+
+    def wait(self, timeout=WORKER_JOIN_TIMEOUT):
+        join_workers(self.workers, timeout)
+
+class AudioCache(QObject):
+    """播放过的歌曲音频缓存在 cache_path/audio 下，总大小超过 audio_cache_size（MB）时淘汰最久未播放的
+
+    首次播放时仍直接播放网络地址，同时在后台把音频下载到缓存，之后再播放就使用本地文件。
+    启动后由后台线程按最近播放顺序校验文件内容，校验完成前的歌曲仍播放网络地址。
+    """
+    def __init__(self, cache_path=None, max_size=None):
+        super().__init__()
+        self.audio_path = os.path.join(cache_path or CONFIG['cache_path'], 'audio')
+        self.index_path = os.path.join(self.audio_path, 'index.json')
+        self.max_bytes = int((max_size or CONFIG['audio_cache_size']) * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.index = {}  # 歌曲标识 -> {'file', 'size', 'hash', 'atime'}
+        self.total_size = 0
+        self.verified = set()  # 本次运行中已校验过内容的歌曲
+        self.filling = {}  # 下载任务编号 -> 歌曲标识
+        self.verifier = None
+        self.running = False
+        # 只用一个下载线程，避免和正在播放的音频抢带宽
+        self.manager = DownloadManager(concurrency=1)
+        self.manager.download_finished.connect(self.on_fill_finished, Qt.DirectConnection)
+        self.manager.download_failed.connect(self.on_fill_failed, Qt.DirectConnection)
+        self.manager.download_cancelled.connect(self.on_fill_failed, Qt.DirectConnection)
+        try:
+            os.makedirs(self.audio_path, exist_ok=True)
+            self.load_index()
+        except OSError as e:
+            print(f"初始化音频缓存失败：{str(e)}")
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        except (OSError, ValueError) as e:
+            print(f"音频缓存索引损坏，已重建：{str(e)}")
+            index = {}
+        for key, entry in index.items():
+            path = os.path.join(self.audio_path, entry['file'])
+            if os.path.exists(path) and os.path.getsize(path) == entry['size']:
+                self.index[key] = entry
+                self.total_size += entry['size']
+        
+        # 清理索引之外的文件，未下载完的 .part 保留一天用于续传
+        files = {entry['file'] for entry in self.index.values()}
+        for name in os.listdir(self.audio_path):
+            path = os.path.join(self.audio_path, name)
+            if name == 'index.json' or name in files:
+                continue
+            if name.endswith('.part') and time.time() - os.path.getmtime(path) < 86400:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def file_name(self, key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest() + '.mp3'
+
+    def file_hash(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(partial(f.read, 1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """返回缓存的本地文件路径，未缓存、尚未校验或文件大小不符时返回 None
+
+        在界面线程调用，只检查文件大小，完整的哈希校验由 verify_entries 在后台完成。
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or key not in self.verified:
+                return None
+            path = os.path.join(self.audio_path, entry['file'])
+            try:
+                valid = os.path.getsize(path) == entry['size']
+            except OSError:
+                valid = False
+            if not valid:
+                print(f"音频缓存已损坏，重新下载：{key}")
+                self.remove_entry(key)
+                self.save_index_quietly()
+                return None
+            entry['atime'] = time.time()
+            return path
+
+    def verify_entries(self):
+        """后台线程：每次运行对上次留下的缓存文件做一次完整校验，最近播放的优先"""
+        with self.lock:
+            keys = sorted(self.index, key=lambda k: self.index[k]['atime'], reverse=True)
+        for key in keys:
+            if not self.running:
+                return
+            with self.lock:
+                entry = self.index.get(key)
+                if entry is None or key in self.verified:
+                    continue
+            try:
+                valid = self.file_hash(os.path.join(self.audio_path, entry['file'])) == entry['hash']
+            except OSError:
+                valid = False
+            with self.lock:
+                if self.index.get(key) is not entry:
+                    # 校验期间条目已被替换或淘汰
+                    continue
+                if valid:
+                    self.verified.add(key)
+                else:
+                    print(f"音频缓存已损坏，重新下载：{key}")
+                    self.remove_entry(key)
+                    self.save_index_quietly()
+
+    def fill(self, key, music_url):
+        """后台下载音频到缓存，已缓存或正在下载时忽略"""
+        with self.lock:
+            if key in self.index or key in self.filling.values():
+                return
+            save_path = os.path.join(self.audio_path, self.file_name(key))
+            task_id = self.manager.add_download(music_url, save_path)
+            self.filling[task_id] = key
+
+    def on_fill_finished(self, task_id, save_path):
+        # 在下载线程中执行，顺便完成哈希计算，不占用界面线程
+        try:
+            size = os.path.getsize(save_path)
+            digest = self.file_hash(save_path)
+        except OSError as e:
+            print(f"写入音频缓存失败：{str(e)}")
+            with self.lock:
+                self.filling.pop(task_id, None)
+            return
+        with self.lock:
+            key = self.filling.pop(task_id, None)
+            if key is None:
+                return
+            if key in self.index:
+                self.remove_entry(key)
+            self.index[key] = {
+                'file': os.path.basename(save_path),
+                'size': size,
+                'hash': digest,
+                'atime': time.time()
+            }
+            self.total_size += size
+            self.verified.add(key)
+            self.evict(keep=key)
+            self.save_index_quietly()
+
+    def on_fill_failed(self, task_id, error=None):
+        with self.lock:
+            key = self.filling.pop(task_id, None)
+        if error:
+            print(f"缓存音频失败：{key} {error}")
+
+    def remove_entry(self, key):
+        entry = self.index.pop(key)
+        self.total_size -= entry['size']
+        self.verified.discard(key)
+        try:
+            os.remove(os.path.join(self.audio_path, entry['file']))
+        except OSError:
+            pass
+
+    def evict(self, keep=None):
+        if self.total_size <= self.max_bytes:
+            return
+        for key in sorted(self.index, key=lambda k: self.index[k]['atime']):
+            if key == keep:
+                continue
+            self.remove_entry(key)
+            if self.total_size <= self.max_bytes:
+                break
+
+    def save_index_quietly(self):
+        try:
+            self.save_index()
+        except OSError as e:
+            print(f"保存音频缓存索引失败：{str(e)}")
+
+    def start(self):
+        self.manager.start()
+        self.running = True
+        self.verifier = threading.Thread(target=self.verify_entries, name='audio-verify', daemon=True)
+        self.verifier.start()
+
+    def stop(self):
+        self.running = False
+        self.manager.stop()
+        with self.lock:
+            self.save_index_quietly()
+
+    def wait(self, timeout=WORKER_JOIN_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        self.manager.wait(timeout)
+        if self.verifier is not None:
+            join_workers([self.verifier], max(deadline - time.monotonic(), 0))
+
+class SpectrumAnalyzer:
+    """把 QAudioProbe 送来的音频缓冲区转换成 0~1 的频谱条高度"""
+    # (采样类型, 位数) -> (numpy 类型, 零点偏移, 满量程)
+    SAMPLE_FORMATS = {
+        (QAudioFormat.SignedInt, 8): ('int8', 0, 128.0),
+        (QAudioFormat.SignedInt, 16): ('int16', 0, 32768.0),
+        (QAudioFormat.SignedInt, 32): ('int32', 0, 2147483648.0),
+        (QAudioFormat.UnSignedInt, 8): ('uint8', 128, 128.0),
+        (QAudioFormat.UnSignedInt, 16): ('uint16', 32768, 32768.0),
+        (QAudioFormat.Float, 32): ('float32', 0, 1.0),
+    }
+    MAX_FFT_SIZE = 2048
+    MIN_DB = -60.0
+
+    def __init__(self, bars=64, min_freq=40, max_freq=16000, attack=0.6, decay=0.15):
+        self.bars = bars
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self.attack = attack
+        self.decay = decay
+        self.levels = np.zeros(bars, dtype=np.float32)
+        self.plans = {}  # (FFT 长度, 采样率) -> (窗函数, 各频谱条起始下标, 截止下标)
+
+    def plan(self, n, sample_rate):
+        key = (n, sample_rate)
+        plan = self.plans.get(key)
+        if plan is None:
+            window = np.hanning(n).astype(np.float32)
+            # 对数分布的频率边界，低频更细、高频更粗，符合听感
+            max_freq = min(self.max_freq, sample_rate / 2)
+            edges = np.geomspace(self.min_freq, max_freq, self.bars + 1)
+            bins = np.clip((edges * n / sample_rate).astype(np.int64), 1, n // 2)
+            end = int(bins[-1]) + 1
+            starts = np.minimum(bins[:-1], end - 1)
+            plan = (window, starts, end)
+            self.plans[key] = plan
+        return plan
+
+    def samples(self, buffer):
+        """按采样格式把缓冲区零拷贝映射为 numpy 数组，返回单声道浮点样本"""
+        fmt = buffer.format()
+        sample_format = self.SAMPLE_FORMATS.get((fmt.sampleType(), fmt.sampleSize()))
+        if sample_format is None:
+            return None, 0  # 不支持的采样格式
+        dtype, offset, scale = sample_format
+        dtype = np.dtype(dtype)
+        if fmt.byteOrder() == QAudioFormat.BigEndian:
+            dtype = dtype.newbyteorder('>')
+        data = buffer.constData()
+        data.setsize(buffer.byteCount())
+        samples = np.frombuffer(data, dtype=dtype)
+        
+        channels = max(fmt.channelCount(), 1)
+        frames = samples[:len(samples) // channels * channels].reshape(-1, channels)
+        mono = frames.mean(axis=1, dtype=np.float32)
+        if offset:
+            mono -= offset
+        mono /= scale
+        return mono, fmt.sampleRate()
+
+    def process(self, buffer):
+        mono, sample_rate = self.samples(buffer)
+        if mono is None or len(mono) < 64 or sample_rate <= 0:
+            return self.levels
+        
+        # 取缓冲区末尾 2 的幂个样本做 FFT
+        n = min(self.MAX_FFT_SIZE, 1 << (len(mono).bit_length() - 1))
+        window, starts, end = self.plan(n, sample_rate)
+        magnitude = np.abs(scipy_fft.rfft(mono[-n:] * window)) * (4.0 / n)
+        
+        # 每个频谱条取所在频段的峰值，再换算成分贝
+        peaks = np.maximum.reduceat(magnitude[:end], starts)
+        db = 20 * np.log10(peaks + 1e-9)
+        target = np.clip((db - self.MIN_DB) / -self.MIN_DB, 0, 1).astype(np.float32)
+        
+        # 上升快、下落慢
+        alpha = np.where(target > self.levels, self.attack, self.decay).astype(np.float32)
+        self.levels += (target - self.levels) * alpha
+        return self.levels
+
+class FrameScheduler(QObject):
+    """按需驱动重绘：有新数据且窗口可见时才出帧，电池供电或绘制超时时降低帧率"""
+    def __init__(self, widget, max_fps=None):
+        super().__init__(widget)
+        self.widget = widget
+        self.max_fps = max_fps or CONFIG['max_fps']
+        self.fps_cap = self.max_fps
+        self.last_frame = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.render)
+        
+        # 定期检查电源和绘制负载
+        self.cap_timer = QTimer(self)
+        self.cap_timer.timeout.connect(self.update_fps_cap)
+        self.cap_timer.start(5000)
+
+    def can_render(self):
+        if not self.widget.isVisible() or self.widget.window().isMinimized():
+            return False
+        handle = self.widget.window().windowHandle()
+        return handle is None or handle.isExposed()  # 被完全遮挡时不绘制
+
+    def request_frame(self):
+        if self.timer.isActive() or not self.can_render():
+            return
+        interval = 1000.0 / self.fps_cap
+        elapsed = (time.monotonic() - self.last_frame) * 1000
+        self.timer.start(int(max(0, interval - elapsed)))
+
+    def render(self):
+        if not self.can_render():
+            return
+        self.last_frame = time.monotonic()
+        self.widget.advance_frame()
+        self.widget.update()
+
+    def update_fps_cap(self):
+        fps = self.max_fps
+        if psutil is not None:
+            try:
+                battery = psutil.sensors_battery()
+            except Exception:
+                battery = None
+            if battery is not None and not battery.power_plugged:
+                fps = min(fps, CONFIG['battery_fps'])
+        if getattr(self.widget, 'frame_cost_ms', 0) > getattr(self.widget, 'FRAME_BUDGET_MS', float('inf')):
+            fps = min(fps, self.max_fps // 2)  # 绘制跟不上时减半
+        self.fps_cap = max(fps, 1)
+
 # 修改 AudioVisualizer 类
 class AudioVisualizer(QGLWidget):
+    VERTICES_PER_BAR = 8  # 频谱条和顶部光晕各 4 个顶点
+    BAR_SPACING = 2
+    GLOW_HEIGHT = 5
+    FRAME_BUDGET_MS = 1.0  # 每帧 CPU 耗时目标
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFixedHeight(100)
         self.bars = 64  # 频谱条数
         self.spectrum_data = np.zeros(self.bars)
         self.prev_spectrum = np.zeros(self.bars)
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update)
-        self.timer.start(16)  # 约60fps
+        self.analyzer = SpectrumAnalyzer(self.bars)
+        
+        # 顶点和颜色数组，每帧只更新顶点的 y 坐标
+        self.vertices = np.zeros((self.bars, self.VERTICES_PER_BAR, 2), dtype=np.float32)
+        self.colors = self.build_palette()
+        self.vertex_buffer = None
+        self.color_buffer = None
+        self.frame_cost_ms = 0.0  # 每帧绘制耗时的滑动平均
+        self.budget_warned = False
+        
+        # 只在收到新频谱或暂停后衰减时重绘，其余时间不出帧
+        self.playing = False
+        self.scheduler = FrameScheduler(self)
+
+    def build_palette(self):
+        """预先计算每个频谱条的渐变色"""
+        colors = np.zeros((self.bars, self.VERTICES_PER_BAR, 4), dtype=np.float32)
+        for i in range(self.bars):
+            hue = (i / self.bars) * 0.3 + 0.5
+            colors[i, :, :3] = colorsys.hsv_to_rgb(hue, 0.8, 0.9)
+        colors[:, :4, 3] = 0.8  # 频谱条
+        colors[:, 4:, 3] = 0.3  # 顶部光晕
+        return colors
         
     def initializeGL(self):
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glClearColor(0.0, 0.0, 0.0, 0.0)
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        gl.glClearColor(0.0, 0.0, 0.0, 0.0)
+        
+        self.vertex_buffer, self.color_buffer = gl.glGenBuffers(2)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vertex_buffer)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, gl.GL_DYNAMIC_DRAW)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.color_buffer)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, self.colors.nbytes, self.colors, gl.GL_STATIC_DRAW)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
         
     def resizeGL(self, w, h):
-        glViewport(0, 0, w, h)
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        glOrtho(0, w, h, 0, -1, 1)
-        glMatrixMode(GL_MODELVIEW)
+        gl.glViewport(0, 0, w, h)
+        gl.glMatrixMode(gl.GL_PROJECTION)
+        gl.glLoadIdentity()
+        gl.glOrtho(0, w, h, 0, -1, 1)
+        gl.glMatrixMode(gl.GL_MODELVIEW)
+        
+        # 横坐标和底边只在尺寸变化时计算
+        bar_width = w / self.bars
+        left = np.arange(self.bars, dtype=np.float32) * bar_width + self.BAR_SPACING
+        right = left + bar_width - self.BAR_SPACING * 2
+        self.vertices[:, 0::4, 0] = left[:, None]
+        self.vertices[:, 3::4, 0] = left[:, None]
+        self.vertices[:, 1::4, 0] = right[:, None]
+        self.vertices[:, 2::4, 0] = right[:, None]
+        self.vertices[:, 0:2, 1] = h
         
     def paintGL(self):
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glLoadIdentity()
+        started = time.perf_counter()
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+        gl.glLoadIdentity()
         
-        width = self.width()
+        # 只更新随频谱变化的 y 坐标
         height = self.height()
-        bar_width = width / self.bars
-        bar_spacing = 2
+        top = (height - self.spectrum_data * height * 0.8).astype(np.float32)[:, None]
+        self.vertices[:, 2:4, 1] = top
+        self.vertices[:, 4:6, 1] = top - self.GLOW_HEIGHT
+        self.vertices[:, 6:8, 1] = top
         
-        for i in range(self.bars):
-            # 添加一些随机波动
-            value = self.spectrum_data[i] * (0.95 + 0.1 * np.random.random())
-            bar_height = value * height * 0.8
-            
-            # 计算渐变色
-            hue = (i / self.bars) * 0.3 + 0.5
-            color = QColor.fromHsvF(hue, 0.8, 0.9)
-            
-            x = i * bar_width + bar_spacing
-            
-            # 绘制频谱条
-            glBegin(GL_QUADS)
-            glColor4f(color.redF(), color.greenF(), color.blueF(), 0.8)
-            glVertex2f(x, height)
-            glVertex2f(x + bar_width - bar_spacing * 2, height)
-            glVertex2f(x + bar_width - bar_spacing * 2, height - bar_height)
-            glVertex2f(x, height - bar_height)
-            
-            # 绘制顶部光晕
-            glow_height = 5
-            glColor4f(color.redF(), color.greenF(), color.blueF(), 0.3)
-            glVertex2f(x, height - bar_height - glow_height)
-            glVertex2f(x + bar_width - bar_spacing * 2, height - bar_height - glow_height)
-            glVertex2f(x + bar_width - bar_spacing * 2, height - bar_height)
-            glVertex2f(x, height - bar_height)
-            glEnd()
+        # 上传顶点后一次绘制全部频谱条
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vertex_buffer)
+        gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, self.vertices.nbytes, self.vertices)
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glVertexPointer(2, gl.GL_FLOAT, 0, None)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.color_buffer)
+        gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+        gl.glColorPointer(4, gl.GL_FLOAT, 0, None)
+        gl.glDrawArrays(gl.GL_QUADS, 0, self.bars * self.VERTICES_PER_BAR)
+        gl.glDisableClientState(gl.GL_COLOR_ARRAY)
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        
+        # 记录每帧耗时，持续超出目标时提示一次
+        cost = (time.perf_counter() - started) * 1000
+        tracer.record('paintGL', started, cost / 1000, 'paint')
+        tracer.count('frames')
+        self.frame_cost_ms = self.frame_cost_ms * 0.95 + cost * 0.05
+        if self.frame_cost_ms > self.FRAME_BUDGET_MS and not self.budget_warned:
+            self.budget_warned = True
+            print(f"频谱绘制耗时 {self.frame_cost_ms:.2f}ms，超出 {self.FRAME_BUDGET_MS}ms 目标")
     
     def update_spectrum(self, data):
         try:
-            # 生成模拟频谱数据
-            target = np.abs(np.random.normal(0, 0.3, self.bars))
-            target = np.clip(target, 0, 1)
-            
-            # 平滑过渡
-            smooth_factor = 0.3
-            self.spectrum_data = self.spectrum_data * (1 - smooth_factor) + target * smooth_factor
-            
-            # 确保数据范围在0-1之间
-            self.spectrum_data = np.clip(self.spectrum_data, 0, 1)
-            
+            with tracer.span('spectrum', 'analyze'):
+                self.spectrum_data = self.analyzer.process(data)
+            self.scheduler.request_frame()
         except Exception as e:
             print(f"频谱更新错误: {str(e)}")
 
+    def set_playing(self, playing):
+        self.playing = playing
+        if not playing:
+            self.scheduler.request_frame()  # 让频谱条落下
+
+    def advance_frame(self):
+        """暂停或停止后逐帧衰减，落到底后不再请求新帧"""
+        if self.playing:
+            return
+        self.analyzer.levels *= 0.8
+        if self.analyzer.levels.max() < 0.01:
+            self.analyzer.levels[:] = 0
+        else:
+            self.scheduler.request_frame()
+        self.spectrum_data = self.analyzer.levels
+
+SEARCH_DEBOUNCE_MS = 300  # 停止输入多久后自动搜索
+
+class SongListModel(QAbstractListModel):
+    """分页加载的歌曲列表，滚动到底部时由视图调用 fetchMore 请求下一页"""
+    page_requested = pyqtSignal(str, int)  # 请求加载下一页（关键词, 页码）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.songs = []  # [(歌名, 歌手, 序号), ...]
+        self.seen = set()  # 用于跨页去重的 (歌名, 歌手)
+        self.keyword = None
+        self.next_page = 2
+        self.has_more = False
+        self.loading = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.songs)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        title, singer, song_number = self.songs[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{title} - {singer}"
+        if role == Qt.UserRole:
+            return song_number
+        return None
+
+    def song(self, row):
+        return self.songs[row]
+
+    def reset(self, songs, keyword=None):
+        """替换为新的结果；keyword 为空表示不支持翻页（例如推荐列表）"""
+        self.beginResetModel()
+        self.songs = []
+        self.seen = set()
+        self.add_unique(songs)
+        self.keyword = keyword
+        self.next_page = 2
+        self.has_more = bool(keyword) and bool(self.songs)
+        self.loading = False
+        self.endResetModel()
+
+    def add_unique(self, songs):
+        added = []
+        for song in songs:
+            if song[:2] not in self.seen:
+                self.seen.add(song[:2])
+                added.append(song)
+        self.songs.extend(added)
+        return len(added)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more and not self.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self.loading = True
+        self.page_requested.emit(self.keyword, self.next_page)
+
+    def append_page(self, keyword, page, songs):
+        if keyword != self.keyword or page != self.next_page:
+            return
+        self.loading = False
+        new_songs = [song for song in songs if song[:2] not in self.seen]
+        if not new_songs:
+            # 接口没有返回新歌曲，说明已经到底
+            self.has_more = False
+            return
+        self.beginInsertRows(QModelIndex(), len(self.songs), len(self.songs) + len(new_songs) - 1)
+        self.add_unique(new_songs)
+        self.endInsertRows()
+        self.next_page += 1
+
+    def page_failed(self, keyword, page):
+        if keyword == self.keyword and page == self.next_page:
+            self.loading = False  # 下次滚动到底部时重试
+
+class PerfOverlay(QLabel):
+    """性能浮层：帧率、事件循环延迟、缓存命中率和最近 5 秒的耗时统计，按 F12 显示或隐藏"""
+    LAG_INTERVAL_MS = 100
+    REFRESH_MS = 500
+
+    def __init__(self, player):
+        super().__init__(player)
+        self.player = player
+        self.setObjectName('perfOverlay')
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet('background-color: rgba(0, 0, 0, 180); color: #9f9; '
+                           'font-family: Consolas, monospace; font-size: 11px; padding: 6px;')
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.last_tick = None
+        self.last_frames = 0
+        self.last_refresh = time.perf_counter()
+        
+        # 定时器实际触发时间比预期晚多少，就是事件循环被阻塞了多久
+        self.lag_timer = QTimer(self)
+        self.lag_timer.timeout.connect(self.measure_lag)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        if self.isVisible():
+            self.lag_timer.stop()
+            self.refresh_timer.stop()
+            self.hide()
+            return
+        self.last_tick = None
+        self.last_frames = tracer.counters.get('frames', 0)
+        self.last_refresh = time.perf_counter()
+        self.lag_timer.start(self.LAG_INTERVAL_MS)
+        self.refresh_timer.start(self.REFRESH_MS)
+        self.refresh()
+        self.show()
+        self.raise_()
+
+    def measure_lag(self):
+        now = time.perf_counter()
+        if self.last_tick is not None:
+            lag = max((now - self.last_tick) * 1000 - self.LAG_INTERVAL_MS, 0)
+            self.lag_ms = self.lag_ms * 0.8 + lag * 0.2
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+        self.last_tick = now
+
+    def refresh(self):
+        now = time.perf_counter()
+        frames = tracer.counters.get('frames', 0)
+        fps = (frames - self.last_frames) / max(now - self.last_refresh, 1e-3)
+        self.last_frames = frames
+        self.last_refresh = now
+        
+        lines = [
+            f'FPS {fps:5.1f}',
+            f'事件循环延迟 {self.lag_ms:5.1f} ms  最大 {self.max_lag_ms:5.1f} ms',
+            f'界面卡顿 {tracer.counters.get("stalls", 0)} 次'
+        ]
+        self.max_lag_ms = 0.0
+        for kind, stats in self.player.cache.stats().items():
+            lookups = stats['hits'] + stats['misses']
+            rate = stats['hits'] / lookups * 100 if lookups else 0
+            lines.append(f'{kind:<8} 命中 {rate:5.1f}%  {stats["entries"]} 项 {stats["bytes"] / 1024:.0f} KB')
+        summary = sorted(tracer.summary().items(), key=lambda item: -item[1]['max_ms'])
+        for name, stats in summary[:8]:
+            lines.append(f'{name:<14}{stats["count"]:>5} 次  平均 {stats["avg_ms"]:7.2f}  最大 {stats["max_ms"]:7.2f} ms')
+        self.setText('\n'.join(lines))
+        self.adjustSize()
+        self.move(10, 10)
+
+APP_FILE = os.path.abspath(__file__)
+
+class StallWatchdog(QObject):
+    """界面线程卡顿监测：界面线程定时打点，监测线程发现打点停止超过 stall_threshold_ms 时采样界面线程的调用栈"""
+    MAX_SAMPLES = 100  # 单次卡顿最多保留的采样数
+
+    def __init__(self, threshold_ms=None, parent=None):
+        super().__init__(parent)
+        threshold_ms = CONFIG['stall_threshold_ms'] if threshold_ms is None else threshold_ms
+        self.threshold = threshold_ms / 1000
+        self.interval_ms = max(int(threshold_ms / 4), 10)
+        self.gui_thread = threading.get_ident()  # 必须在界面线程中创建
+        self.lock = threading.Lock()
+        self.last_beat = time.perf_counter()
+        self.stall_started = None
+        self.samples = []  # 本次卡顿期间采样到的调用栈
+        self.sites = {}  # 调用位置 -> {'count', 'total_ms', 'max_ms', 'stack'}
+        self.running = False
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.beat)
+        self.thread = threading.Thread(target=self.run, name='stall-watchdog', daemon=True)
+
+    def start(self):
+        if self.threshold <= 0:
+            return
+        self.running = True
+        self.last_beat = time.perf_counter()
+        self.timer.start(self.interval_ms)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.timer.stop()
+
+    def beat(self):
+        now = time.perf_counter()
+        with self.lock:
+            last_beat = self.last_beat
+            samples = self.samples if self.stall_started is not None else None
+            self.last_beat = now
+            self.stall_started = None
+            self.samples = []
+        if samples:
+            self.report_stall(last_beat, now, samples)
+
+    def run(self):
+        while self.running:
+            time.sleep(self.interval_ms / 1000)
+            with self.lock:
+                if time.perf_counter() - self.last_beat < self.threshold:
+                    continue
+                if self.stall_started is None:
+                    self.stall_started = self.last_beat
+                if len(self.samples) >= self.MAX_SAMPLES:
+                    continue
+            frame = sys._current_frames().get(self.gui_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            with self.lock:
+                if self.stall_started is not None:
+                    self.samples.append(stack)
+
+    def call_site(self, stack):
+        """返回 (程序内最内层的调用位置, 实际阻塞所在的最内层位置)"""
+        innermost = stack[-1]
+        for entry in reversed(stack):
+            if os.path.abspath(entry.filename) == APP_FILE:
+                return f'{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})', innermost
+        return f'{innermost.name} ({os.path.basename(innermost.filename)}:{innermost.lineno})', innermost
+
+    def report_stall(self, last_beat, now, samples):
+        # 卡顿期间采样最多的位置就是罪魁祸首
+        counts = {}
+        for stack in samples:
+            site, innermost = self.call_site(stack)
+            if site not in counts:
+                counts[site] = [0, stack, innermost]
+            counts[site][0] += 1
+        site, (_, stack, innermost) = max(counts.items(), key=lambda item: item[1][0])
+        duration_ms = (now - last_beat) * 1000 - self.interval_ms
+        
+        tracer.record('stall', last_beat, now - last_beat, 'gui')
+        tracer.count('stalls')
+        with self.lock:
+            entry = self.sites.setdefault(site, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'stack': ''})
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            if duration_ms > entry['max_ms']:
+                entry['max_ms'] = duration_ms
+                entry['stack'] = ''.join(traceback.format_list(stack))
+        print(f"界面线程卡顿 {duration_ms:.0f} ms：{site}，阻塞于 "
+              f"{os.path.basename(innermost.filename)}:{innermost.lineno} {innermost.name}")
+
+    def report(self):
+        """按累计卡顿时间排序的调用位置"""
+        with self.lock:
+            sites = [dict(entry, site=site) for site, entry in self.sites.items()]
+        return sorted(sites, key=lambda entry: -entry['total_ms'])
+
+class LyricTimeline:
+    """歌词时间轴：按时间戳二分定位当前行，每行的 HTML 片段预先生成"""
+    CURRENT_STYLE = '''
+                        <p style="
+                            color: #ffffff;
+                            font-size: 22px;
+                            font-weight: bold;
+                            margin: 15px 0;
+                            text-shadow: 0 0 10px rgba(52, 152, 219, 0.8);
+                            background: linear-gradient(45deg, #3498db, #2ecc71);
+                            -webkit-background-clip: text;
+                            padding: 5px 10px;
+                            border-radius: 5px;
+                            transition: all 0.3s ease;
+                        ">%s</p>
+                    '''
+    OTHER_STYLE = '''
+                        <p style="
+                            color: rgba(255, 255, 255, %s);
+                            font-size: 16px;
+                            margin: 10px 0;
+                            text-align: center;
+                            transition: all 0.3s ease;
+                        ">%%s</p>
+                    '''
+    CONTAINER = '''
+                <div style="
+                    background: rgba(0, 0, 0, 0.3);
+                    border-radius: 15px;
+                    padding: 20px;
+                    text-align: center;
+                ">
+                    %s
+                </div>
+            '''
+
+    def __init__(self, lyrics):
+        self.times = lyrics.times
+        texts = [html.escape(text) for text in lyrics.texts]
+        for i, translation in enumerate(lyrics.translations):
+            if translation:
+                texts[i] += f'<br><span style="font-size: 14px;">{html.escape(translation)}</span>'
+
+        near_style = self.OTHER_STYLE % 0.6  # 距离当前歌词越远越透明
+        far_style = self.OTHER_STYLE % 0.4
+        self.current_html = [self.CURRENT_STYLE % text for text in texts]
+        self.near_html = [near_style % text for text in texts]
+        self.far_html = [far_style % text for text in texts]
+        self.cursor = -1
+
+    def __len__(self):
+        return len(self.times)
+
+    def locate(self, position):
+        """返回 position 所在的歌词行，没有到达第一行时为 -1"""
+        times = self.times
+        cursor = self.cursor
+        after_current = cursor < 0 or times[cursor] <= position
+        if after_current and (cursor + 1 >= len(times) or position < times[cursor + 1]):
+            return cursor
+        
+        # 正常播放时只会前进一行，拖动进度条时才需要二分查找
+        nxt = cursor + 1
+        if after_current and times[nxt] <= position and (nxt + 1 >= len(times) or position < times[nxt + 1]):
+            self.cursor = nxt
+        else:
+            self.cursor = bisect_right(times, position) - 1
+        return self.cursor
+
+    def render(self, index):
+        """拼接当前行前后各两行的 HTML"""
+        fragments = []
+        for i in range(max(0, index - 2), min(len(self.times), index + 3)):
+            if i == index:
+                fragments.append(self.current_html[i])
+            elif abs(i - index) == 1:
+                fragments.append(self.near_html[i])
+            else:
+                fragments.append(self.far_html[i])
+        return self.CONTAINER % ''.join(fragments)
+
 class MusicPlayer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.player = QMediaPlayer()
         self.current_lyrics = []
         self.current_lyric_index = -1
+        self.lyric_timeline = None
         self.current_music_url = None
+        self.current_song_key = None
+        self.current_lrc_url = None
+        self.current_cover_url = None
+        self.pending_song = None  # 等待详情返回的歌曲（歌曲标识, 显示文本, 歌名, 序号）
+        self.current_song = None  # 正在播放的歌曲，格式同 pending_song
+        self.refreshed_key = None  # 已因播放地址失效刷新过详情的歌曲，避免反复重试
+        self.resume_position = 0  # 刷新播放地址后从该位置继续播放
+        self.prefetch_key = None  # 已预加载的下一首歌曲标识
+        self.recommender = None
         
         # 创建所有控件
         self.search_input = QLineEdit()
         self.search_btn = QPushButton('搜索')
-        self.online_list = QListWidget()
+        self.online_list = QListView()
+        self.song_model = SongListModel(self)
+        self.online_list.setModel(self.song_model)
+        self.online_list.setUniformItemSizes(True)  # 行高一致，布局时不用逐行测量
         self.lyrics_label = QLabel()
         self.playing_status = QLabel()
         self.time_label = QLabel('00:00/00:00')
@@ -294,11 +1660,42 @@ class MusicPlayer(QMainWindow):
         self.cover_animation.setLoopCount(-1)  # 无限循环
         
         # 添加缓存和异步加载器
+        self.source = MgMusicSource()
         self.cache = Cache()
-        self.loader = AsyncLoader(self.cache)
+        self.disk_cache = DiskCache()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.disk_cache.flush)
+        self.flush_timer.start(DiskCache.FLUSH_INTERVAL_MS)
+        self.loader = AsyncLoader(self.cache, self.disk_cache, source=self.source)
         self.loader.lyrics_loaded.connect(self.on_lyrics_loaded)
         self.loader.cover_loaded.connect(self.on_cover_loaded)
-        self.loader.start()
+        self.loader.detail_loaded.connect(self.on_detail_loaded)
+        self.loader.detail_failed.connect(self.on_detail_failed)
+        
+        # 后台搜索线程
+        self.searcher = SearchWorker(self.source)
+        self.searcher.search_finished.connect(self.on_search_finished)
+        self.song_model.page_requested.connect(self.searcher.fetch_page)
+        self.searcher.search_failed.connect(self.on_search_failed)
+        
+        # 下载管理器
+        self.downloader = DownloadManager()
+        self.downloader.download_progress.connect(self.on_download_progress)
+        self.downloader.download_finished.connect(self.on_download_finished)
+        self.downloader.download_failed.connect(self.on_download_failed)
+        self.downloader.download_cancelled.connect(self.on_download_cancelled)
+        
+        # 音频缓存、音频探针和频谱组件在窗口首次绘制后再创建，见 init_deferred
+        self.audio_cache = None
+        self.audio_probe = None
+        self.visualizer = None
+        self.first_painted = False
+        
+        # 输入停顿后再自动搜索
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.on_search_timeout)
+        self.interactive_search_id = None  # 手动发起的搜索，失败时才弹窗提示
         
         # 添加防抖动计时器
         self.lyrics_update_timer = QTimer()
@@ -307,16 +1704,50 @@ class MusicPlayer(QMainWindow):
 
         self.play_mode = 'sequence'
         
+        # 初始化UI
+        self.init_ui()
+        
+        # 界面线程卡顿监测
+        self.watchdog = StallWatchdog(parent=self)
+        self.watchdog.start()
+        
+        # 性能浮层和 Chrome trace 导出
+        self.perf_overlay = PerfOverlay(self)
+        QShortcut(QKeySequence('F12'), self, self.perf_overlay.toggle)
+        QShortcut(QKeySequence('Ctrl+Shift+T'), self, self.dump_trace)
+        
+        self.show()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_painted:
+            self.first_painted = True
+            if STARTUP_PROBE:
+                print(f'first_paint_ms={(time.perf_counter() - START_TIME) * 1000:.1f}', flush=True)
+            QTimer.singleShot(0, self.init_deferred)
+
+    def init_deferred(self):
+        """窗口画出来之后再启动后台线程、创建频谱组件并加载推荐音乐"""
+        self.loader.start()
+        self.downloader.start()
+        self.audio_cache = AudioCache()
+        self.audio_cache.start()
+        
+        # 创建可视化组件，numpy、scipy 和 OpenGL 在这里才真正加载
+        self.visualizer = AudioVisualizer()
+        self.visualizer_layout.addWidget(self.visualizer)
+        self.visualizer.set_playing(self.player.state() == QMediaPlayer.PlayingState)
+        
         # 创建音频探针
         self.audio_probe = QAudioProbe()
         self.audio_probe.audioBufferProbed.connect(self.process_audio)
         
-        # 创建可视化组件
-        self.visualizer = AudioVisualizer()
+        if STARTUP_PROBE:
+            print(f'deferred_ms={(time.perf_counter() - START_TIME) * 1000:.1f}', flush=True)
+            self.close()
+            return
         
-        # 初始化UI
-        self.init_ui()
-        self.show()
+        self.load_recommended_music()
 
     def init_ui(self):
         # 设置窗口背景渐变
@@ -427,9 +1858,8 @@ class MusicPlayer(QMainWindow):
         # 频谱显示器
         visualizer_container = QWidget()
         visualizer_container.setObjectName("visualizerContainer")
-        visualizer_layout = QVBoxLayout(visualizer_container)
-        visualizer_layout.setContentsMargins(5, 5, 5, 5)
-        visualizer_layout.addWidget(self.visualizer)
+        self.visualizer_layout = QVBoxLayout(visualizer_container)
+        self.visualizer_layout.setContentsMargins(5, 5, 5, 5)
         
         # 创建按钮容器
         buttons_container = QWidget()
@@ -534,21 +1964,21 @@ class MusicPlayer(QMainWindow):
         # 绑定事
         self.search_btn.clicked.connect(self.search_music)
         self.search_input.returnPressed.connect(self.search_music)  # 添加回车搜索
+        self.search_input.textChanged.connect(self.on_search_text_changed)
         self.play_btn.clicked.connect(self.toggle_play_pause)
         self.stop_btn.clicked.connect(self.stop_music)
         self.prev_btn.clicked.connect(self.play_previous)
         self.next_btn.clicked.connect(self.play_next)
-        self.online_list.itemDoubleClicked.connect(self.play_online_music)
+        self.online_list.doubleClicked.connect(self.play_online_music)
         self.progress_slider.sliderMoved.connect(self.set_position)
         self.volume_slider.valueChanged.connect(self.set_volume)
         self.player.positionChanged.connect(self.update_position)
         self.player.durationChanged.connect(self.update_duration)
         self.mode_btn.clicked.connect(self.toggle_play_mode)
         self.player.mediaStatusChanged.connect(self.on_media_status_changed)
+        self.player.stateChanged.connect(self.on_player_state_changed)
+        self.player.error.connect(self.on_player_error)
         self.download_btn.clicked.connect(self.download_current_music)
-        
-        # 加载推荐音乐
-        self.load_recommended_music()
 
     def apply_style(self):
         self.setStyleSheet("""
@@ -846,218 +2276,294 @@ class MusicPlayer(QMainWindow):
         """)
 
     def search_music(self):
-        keyword = self.search_input.text()
+        self.search_timer.stop()
+        keyword = self.search_input.text().strip()
         if not keyword:
             QMessageBox.warning(self, '提示', '请输入搜索关键词！')
             return
-            
-        try:
-            url = f'https://api.cenguigui.cn/api/mg_music/?msg={keyword}&type=json'
-            response = requests.get(url)
-            text_response = response.text
-            
-            self.online_list.clear()
-            
-            if text_response.startswith('1.'):
-                songs = text_response.strip().split('\n')
-                for i, song in enumerate(songs, 1):
-                    if ' -- ' in song:
-                        song_info = song.split('.', 1)[1].strip()
-                        title, singer = song_info.split(' -- ')
-                        
-                        item = QListWidgetItem(f"{title} - {singer}")
-                        item.setData(Qt.UserRole, i)
-                        self.online_list.addItem(item)
-                
-                if self.online_list.count() > 0:
-                    self.status_label.setText('搜索完成')
-                else:
-                    self.status_label.setText('未找到相关音乐')
-            else:
-                QMessageBox.warning(self, '错误', '搜索失败，请稍后重试！')
-                
-        except Exception as e:
-            QMessageBox.warning(self, '错误', f'搜索出错：{str(e)}')
-            print("搜索错误详情:", str(e))
+        self.interactive_search_id = self.start_search(keyword)
+
+    def on_search_text_changed(self, text):
+        self.search_timer.start(SEARCH_DEBOUNCE_MS)
+
+    def on_search_timeout(self):
+        keyword = self.search_input.text().strip()
+        shown = self.song_model.keyword
+        if keyword and (shown is None or normalize_text(keyword) != normalize_text(shown)):
+            self.start_search(keyword)
+
+    def start_search(self, keyword):
+        """有缓存时立即显示，缓存超过 search_ttl 时仍在后台重新搜索；返回搜索编号，未发起搜索时返回 None"""
+        cached = self.cache.get_search(normalize_text(keyword))
+        if cached is not None:
+            songs, fetched_at = cached
+            self.show_search_results(keyword, songs)
+            if time.time() - fetched_at < CONFIG['search_ttl']:
+                self.searcher.cancel()  # 丢弃之前还没返回的搜索
+                return None
+        else:
+            self.status_label.setText('搜索中...')
+        
+        # 交给后台线程搜索，新的搜索会取消旧的
+        return self.searcher.search(keyword)
+
+    def show_search_results(self, keyword, songs):
+        self.song_model.reset(songs, keyword)
+        if self.song_model.rowCount() > 0:
+            self.status_label.setText('搜索完成')
+        else:
+            self.status_label.setText('未找到相关音乐')
 
-    def play_online_music(self, item):
+    def on_search_finished(self, search_id, keyword, page, songs):
+        if self.searcher.is_stale(search_id):
+            return
+        
+        if page > 1:
+            self.song_model.append_page(keyword, page, songs)
+            return
+        
+        query = normalize_text(keyword)
+        cached = self.cache.get_search(query)
+        self.cache.add_search(query, songs)
+        if cached is not None and cached[0] == songs and self.song_model.keyword == keyword:
+            # 后台刷新的结果和正在显示的缓存一致，保留已加载的后续页
+            return
+        self.show_search_results(keyword, songs)
+
+    def on_search_failed(self, search_id, keyword, page, error):
+        if self.searcher.is_stale(search_id):
+            return
+        if page > 1:
+            self.song_model.page_failed(keyword, page)
+            print("加载下一页失败:", error)
+            return
+        print("搜索错误详情:", error)
+        if self.song_model.keyword == keyword:
+            return  # 已经显示了缓存的结果
+        self.status_label.setText('搜索失败')
+        if search_id == self.interactive_search_id:
+            QMessageBox.warning(self, '错误', error)
+
+    def song_info(self, row):
+        """返回 (歌曲标识, 歌名, 序号)"""
+        title, singer, song_number = self.song_model.song(row)
+        return self.source.song_key(title, singer), title, song_number
+
+    def current_row(self):
+        return self.online_list.currentIndex().row()
+
+    def play_row(self, row):
+        self.play_online_music(self.song_model.index(row))
+
+    def play_online_music(self, index):
+        self.online_list.setCurrentIndex(index)
+        url, title, song_number = self.song_info(index.row())
+        song_text = index.data(Qt.DisplayRole)
+        self.pending_song = (url, song_text, title, song_number)
+        self.refreshed_key = None
+        self.resume_position = 0
+        
+        # 已预加载过详情的歌曲直接播放，否则交给后台线程获取
+        song_data = self.loader.cached_detail(url)
+        if song_data is not None:
+            self.on_detail_loaded(url, song_data)
+        else:
+            self.loader.cancel_stale({url})
+            self.loader.add_task('detail', url, url, payload=(title, song_number))
+            self.status_label.setText('加载中...')
+
+    def on_detail_loaded(self, url, song_data):
+        if self.pending_song and self.pending_song[0] == url:
+            self.current_song = self.pending_song
+            self.pending_song = None
+            self.start_playback(url, self.current_song[1], song_data)
+        elif url == self.prefetch_key:
+            # 预加载下一首的音频、歌词和封面
+            if song_data.get('music_url'):
+                self.audio_cache.fill(url, song_data['music_url'])
+            if song_data.get('lrc_url'):
+                self.loader.add_task('lyrics', song_data['lrc_url'], url, prefetch=True)
+            if song_data.get('cover'):
+                self.loader.add_task('cover', song_data['cover'], url, prefetch=True)
+
+    def on_detail_failed(self, url, error):
+        if self.pending_song and self.pending_song[0] == url:
+            self.pending_song = None
+            error_msg = f"播放失败: {error}"
+            QMessageBox.warning(self, '错误', error_msg)
+            print("播放错误详情:", error_msg)
+        elif url == self.prefetch_key:
+            print(f"预加载失败：{error}")
+
+    def start_playback(self, url, song_text, song_data):
         try:
-            self.online_list.setCurrentItem(item)
-            song_number = item.data(Qt.UserRole)
-            song_text = item.text()
-            title = song_text.split(' - ')[0]
-            
-            url = f'https://api.cenguigui.cn/api/mg_music/?msg={title}&n={song_number}&type=json'
-            response = requests.get(url, verify=False)  # 禁用SSL验证
-            
-            if response.status_code != 200:
-                raise Exception(f"API请求失败: {response.status_code}")
-            
-            data = response.json()
-            
-            if data.get('code') != 200:
-                raise Exception(f"API返回错误: {data.get('msg', '未知错误')}")
-            
-            song_data = data.get('data')
-            if not song_data:
-                raise Exception("未获取到歌曲数据")
-            
             music_url = song_data.get('music_url')
             if not music_url:
                 raise Exception("未获取到音URL")
             
             self.current_music_url = music_url
+            self.current_song_key = url
             
-            # 播放音乐
-            media_content = QMediaContent(QUrl(music_url))
+            # 播放音乐，已缓存的歌曲直接播放本地文件，否则边播放边在后台缓存
+            local_path = self.audio_cache.get(url)
+            if local_path:
+                media_content = QMediaContent(QUrl.fromLocalFile(os.path.abspath(local_path)))
+            else:
+                media_content = QMediaContent(QUrl(music_url))
+                self.audio_cache.fill(url, music_url)
             self.player.setMedia(media_content)
             
             # 设置音频探针
-            self.audio_probe.setSource(None)  # 先清除之前的源
-            self.audio_probe.setSource(self.player)  # 设置新的源
+            if self.audio_probe:
+                self.audio_probe.setSource(None)  # 先清除之前的源
+                self.audio_probe.setSource(self.player)  # 设置新的源
             
             self.player.play()
+            if self.resume_position:
+                self.player.setPosition(self.resume_position)
+                self.resume_position = 0
             
             # 更新界面
             self.playing_status.setText(f'正在播放: {song_text}')
             self.status_label.setText('播放中')
             
-            # 加载歌词和封面
+            # 加载歌词和封面，之前歌曲还没开始的加载任务直接取消
+            self.loader.cancel_stale({self.current_song_key})
             lrc_url = song_data.get('lrc_url')
+            self.current_lrc_url = lrc_url
             if lrc_url:
                 self.update_lyrics_text(lrc_url)
             
             cover_url = song_data.get('cover')
+            self.current_cover_url = cover_url
             if cover_url:
                 self.update_cover(cover_url)
             
             # 播放音乐时重启旋转动画
             self.cover_animation.start()
+            self.update_animation_state()
             
         except Exception as e:
             error_msg = f"播放失败: {str(e)}"
             QMessageBox.warning(self, '错误', error_msg)
             print("播放错误详情:", error_msg)
 
+    def on_player_error(self, error):
+        """播放地址过期（如 CDN 返回 403）时刷新歌曲详情并从原位置继续，每首歌只刷新一次"""
+        if error not in (QMediaPlayer.ResourceError, QMediaPlayer.NetworkError, QMediaPlayer.AccessDeniedError):
+            return
+        if not self.current_song or self.current_song[0] == self.refreshed_key:
+            self.status_label.setText('播放失败')
+            print("播放错误详情:", self.player.errorString())
+            return
+        
+        key, song_text, title, song_number = self.current_song
+        self.refreshed_key = key
+        self.resume_position = self.player.position()
+        self.loader.invalidate_detail(key)
+        self.pending_song = self.current_song
+        self.loader.add_task('detail', key, key, payload=(title, song_number))
+        self.status_label.setText('正在刷新播放地址...')
+
+    def prefetch_next(self, position):
+        """当前歌曲播放到 prefetch_ratio 后预加载下一首的详情、歌词和封面"""
+        duration = self.player.duration()
+        if self.play_mode != 'sequence' or duration <= 0 or not self.current_song_key:
+            return
+        if position < duration * CONFIG['prefetch_ratio']:
+            return
+        
+        next_row = self.current_row() + 1
+        if next_row >= self.song_model.rowCount():
+            return
+        url, title, song_number = self.song_info(next_row)
+        if url == self.prefetch_key:
+            return
+        
+        self.prefetch_key = url
+        song_data = self.loader.cached_detail(url)
+        if song_data is not None:
+            self.on_detail_loaded(url, song_data)
+        else:
+            self.loader.add_task('detail', url, url, prefetch=True, payload=(title, song_number))
+
     def update_lyrics_text(self, lrc_url):
-        self.loader.add_task('lyrics', lrc_url)
+        self.loader.add_task('lyrics', lrc_url, self.current_song_key)
 
     def update_cover(self, cover_url):
-        self.loader.add_task('cover', cover_url)
+        self.loader.add_task('cover', cover_url, self.current_song_key)
 
     def on_lyrics_loaded(self, url, lyrics):
+        # 多个线程并行加载，忽略已切走歌曲的结果
+        if url != self.current_lrc_url:
+            return
         self.current_lyrics = lyrics
-        self.current_lyric_index = -1
+        self.lyric_timeline = LyricTimeline(lyrics)
+        self.current_lyric_index = None  # 强制刷新一次显示
         self.update_lyrics_display(0)
 
-    def on_cover_loaded(self, url, pixmap):
-        """修改封面加载法，使其显示为圆形"""
-        # 创建圆形遮罩
-        mask = QPixmap(300, 300)
-        mask.fill(Qt.transparent)
-        painter = QPainter(mask)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setBrush(Qt.white)
-        painter.setPen(Qt.NoPen)
-        painter.drawEllipse(0, 0, 300, 300)
-        painter.end()
-        
-        # 将原图缩放并裁剪成圆形
-        scaled_pixmap = pixmap.scaled(300, 300, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-        
-        # 居中裁剪
-        if scaled_pixmap.width() > 300:
-            x = (scaled_pixmap.width() - 300) // 2
-            scaled_pixmap = scaled_pixmap.copy(x, 0, 300, 300)
-        if scaled_pixmap.height() > 300:
-            y = (scaled_pixmap.height() - 300) // 2
-            scaled_pixmap = scaled_pixmap.copy(0, y, 300, 300)
-        
-        # 应用圆形遮罩
-        result = QPixmap(300, 300)
-        result.fill(Qt.transparent)
-        painter = QPainter(result)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.drawPixmap(0, 0, mask)
-        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
-        painter.drawPixmap(0, 0, scaled_pixmap)
-        painter.end()
+    def on_cover_loaded(self, url, image):
+        """封面已在工作线程处理成圆形，这里只转换成 QPixmap"""
+        if url != self.current_cover_url:
+            return
         
         # 设置图片到旋转标签
-        self.cover_mask.setPixmap(result)
+        with tracer.span('cover_pixmap', 'gui'):
+            self.cover_mask.setPixmap(QPixmap.fromImage(image))
         
         # 开始旋转动画
         self.cover_animation.start()
+        self.update_animation_state()
 
     def update_lyrics_display(self, current_time=None):
         if current_time is None:
             current_time = self.player.position()
         
-        if not self.current_lyrics:
+        if not self.lyric_timeline:
             return
         
         # 查找当前时间对应的歌词
-        index = -1
-        for i, (time, _) in enumerate(self.current_lyrics):
-            if time > current_time:
-                break
-            index = i
+        index = self.lyric_timeline.locate(current_time)
         
         # 如果歌词索引发生变化，更新显示
         if index != self.current_lyric_index:
             self.current_lyric_index = index
-            
-            # 构建显示文本
-            display_lyrics = []
-            start_index = max(0, index - 2)  # 显示当前歌词的前两行
-            end_index = min(len(self.current_lyrics), index + 3)  # 显示当前歌词的后两行
-            
-            for i in range(start_index, end_index):
-                lyric = self.current_lyrics[i][1]
-                if i == index:
-                    # 当前播放的歌词 - 更大字体、高亮显示、添加动画效果
-                    display_lyrics.append(f'''
-                        <p style="
-                            color: #ffffff;
-                            font-size: 22px;
-                            font-weight: bold;
-                            margin: 15px 0;
-                            text-shadow: 0 0 10px rgba(52, 152, 219, 0.8);
-                            background: linear-gradient(45deg, #3498db, #2ecc71);
-                            -webkit-background-clip: text;
-                            padding: 5px 10px;
-                            border-radius: 5px;
-                            transition: all 0.3s ease;
-                        ">{lyric}</p>
-                    ''')
-                else:
-                    # 其他歌词 - 半透明效果
-                    opacity = 0.6 if abs(i - index) == 1 else 0.4  # 距离当前歌词越远越透明
-                    display_lyrics.append(f'''
-                        <p style="
-                            color: rgba(255, 255, 255, {opacity});
-                            font-size: 16px;
-                            margin: 10px 0;
-                            text-align: center;
-                            transition: all 0.3s ease;
-                        ">{lyric}</p>
-                    ''')
-            
-            # 更新歌词显示
-            self.lyrics_label.setText('''
-                <div style="
-                    background: rgba(0, 0, 0, 0.3);
-                    border-radius: 15px;
-                    padding: 20px;
-                    text-align: center;
-                ">
-                    %s
-                </div>
-            ''' % ''.join(display_lyrics))
+            self.lyrics_label.setText(self.lyric_timeline.render(index))
 
     def stop_music(self):
         self.player.stop()
         self.cover_animation.stop()  # 停止旋转动画
+
+    def on_player_state_changed(self, state):
+        if self.visualizer:
+            self.visualizer.set_playing(state == QMediaPlayer.PlayingState)
+        self.update_animation_state()
+
+    def update_animation_state(self):
+        """只在播放中且窗口可见时转动封面"""
+        playing = self.player.state() == QMediaPlayer.PlayingState
+        visible = self.isVisible() and not self.isMinimized()
+        state = self.cover_animation.state()
+        if playing and visible:
+            if state == QPropertyAnimation.Paused:
+                self.cover_animation.resume()
+            elif state == QPropertyAnimation.Stopped:
+                self.cover_animation.start()
+        elif state == QPropertyAnimation.Running:
+            self.cover_animation.pause()
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.update_animation_state()
+        super().changeEvent(event)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_animation_state()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_animation_state()
         
     def set_position(self, position):
         self.player.setPosition(position)
@@ -1074,6 +2580,7 @@ class MusicPlayer(QMainWindow):
         
         # 更新歌词显示
         self.update_lyrics_display(position)
+        self.prefetch_next(position)
     
     def update_duration(self, duration):
         self.progress_slider.setRange(0, duration)
@@ -1087,57 +2594,98 @@ class MusicPlayer(QMainWindow):
         if self.player.state() == QMediaPlayer.PlayingState:
             self.player.pause()
             self.play_btn.setText('▶ 播放')
-            self.cover_animation.pause()
         else:
             self.player.play()
             self.play_btn.setText('⏸ 暂停')
-            self.cover_animation.resume()
 
     def play_previous(self):
-        current_row = self.online_list.currentRow()
+        current_row = self.current_row()
         if current_row > 0:
-            self.online_list.setCurrentRow(current_row - 1)
-            self.play_online_music(self.online_list.currentItem())
+            self.play_row(current_row - 1)
 
     def play_next(self):
-        current_row = self.online_list.currentRow()
-        if current_row < self.online_list.count() - 1:
-            self.online_list.setCurrentRow(current_row + 1)
-            self.play_online_music(self.online_list.currentItem())
+        current_row = self.current_row()
+        if current_row < self.song_model.rowCount() - 1:
+            self.play_row(current_row + 1)
 
     def load_recommended_music(self):
-        keywords = ['周杰伦', '林俊杰', '邓紫棋', '薛之谦', '张学友']
-        try:
-            keyword = random.choice(keywords)
-            url = f'https://api.cenguigui.cn/api/mg_music/?msg={keyword}&type=json'
-            response = requests.get(url)
-            text_response = response.text
-            
-            if text_response.startswith('1.'):
-                songs = text_response.strip().split('\n')
-                for i, song in enumerate(songs, 1):
-                    if ' -- ' in song:
-                        song_info = song.split('.', 1)[1].strip()
-                        title, singer = song_info.split(' -- ')
-                        
-                        item = QListWidgetItem(f"{title} - {singer}")
-                        item.setData(Qt.UserRole, i)
-                        self.online_list.addItem(item)
-                
-                if self.online_list.count() > 0:
-                    self.status_label.setText('推荐音乐加载完成')
-                else:
-                    self.status_label.setText('未找到荐音乐')
-            else:
-                self.status_label.setText('加载推荐音乐失败')
-                
-        except Exception as e:
-            print(f"加载推荐音乐失败：{str(e)}")
+        """先显示上次缓存的推荐，再在后台刷新"""
+        cached = self.disk_cache.get('recommend', 'songs')
+        if cached is not None:
+            try:
+                songs = [tuple(song) for song in json.loads(cached.decode('utf-8'))]
+                self.song_model.reset(songs)
+            except ValueError as e:
+                print(f"推荐缓存损坏：{str(e)}")
+        
+        self.recommender = RecommendWorker(self.source)
+        self.recommender.recommend_loaded.connect(self.on_recommend_loaded)
+        self.recommender.recommend_failed.connect(self.on_recommend_failed)
+        self.recommender.start()
+        if self.song_model.rowCount() == 0:
+            self.status_label.setText('正在加载推荐音乐...')
+
+    def showing_recommendations(self):
+        # 搜索过之后列表就不再是推荐内容
+        return self.song_model.keyword is None and self.searcher.search_id == 0
+
+    def on_recommend_loaded(self, songs):
+        self.disk_cache.put('recommend', 'songs', json.dumps(songs, ensure_ascii=False).encode('utf-8'))
+        if not self.showing_recommendations():
+            return
+        if songs != self.song_model.songs and self.current_row() < 0:
+            # 已经在播放缓存列表中的歌曲时不替换，新结果留到下次启动显示
+            self.song_model.reset(songs)
+        if self.song_model.rowCount() > 0:
+            self.status_label.setText('推荐音乐加载完成')
+        else:
+            self.status_label.setText('未找到荐音乐')
+
+    def on_recommend_failed(self, error):
+        print(f"加载推荐音乐失败：{error}")
+        if self.showing_recommendations() and self.song_model.rowCount() == 0:
             self.status_label.setText('加载推荐音乐失败')
 
+    def dump_trace(self, path=None):
+        path = path or CONFIG['trace_file'] or os.path.join(
+            CONFIG['cache_path'], f'trace-{time.strftime("%Y%m%d-%H%M%S")}.json')
+        try:
+            tracer.dump_chrome_trace(path)
+            self.status_label.setText(f'性能记录已保存到 {path}')
+        except OSError as e:
+            print(f"保存性能记录失败：{str(e)}")
+
+    def save_stall_report(self):
+        """把卡顿位置汇总写入缓存目录的 stalls.json"""
+        sites = self.watchdog.report()
+        if not sites:
+            return
+        path = os.path.join(CONFIG['cache_path'], 'stalls.json')
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(sites, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"保存卡顿记录失败：{str(e)}")
+            return
+        print(f"共记录 {sum(entry['count'] for entry in sites)} 次界面卡顿，详见 {path}")
+
     def closeEvent(self, event):
+        self.watchdog.stop()
+        self.save_stall_report()
+        if self.recommender:
+            self.recommender.stop()
         self.loader.stop()
+        self.searcher.stop()
+        self.downloader.stop()
+        if self.audio_cache:
+            self.audio_cache.stop()
         self.loader.wait()
+        self.downloader.wait()
+        if self.audio_cache:
+            self.audio_cache.wait()
+        self.disk_cache.flush()
+        if CONFIG['trace_file']:
+            self.dump_trace()
         event.accept()
 
     def download_current_music(self):
@@ -1145,42 +2693,45 @@ class MusicPlayer(QMainWindow):
             QMessageBox.warning(self, '提示', '请先选择要下载的音乐！')
             return
         
-        try:
-            # 获取保存路径
-            file_name = self.playing_status.text().replace('正在播放: ', '').replace('/', '_') + '.mp3'
-            save_path, _ = QFileDialog.getSaveFileName(
-                self, 
-                '保存音乐', 
-                file_name,
-                'MP3 文件 (*.mp3)'
-            )
-            
-            if save_path:
-                # 开始下载
-                response = requests.get(self.current_music_url, stream=True, verify=False)
-                total_size = int(response.headers.get('content-length', 0))
-                
-                if response.status_code == 200:
-                    with open(save_path, 'wb') as file:
-                        if total_size == 0:
-                            file.write(response.content)
-                        else:
-                            downloaded = 0
-                            for data in response.iter_content(chunk_size=4096):
-                                downloaded += len(data)
-                                file.write(data)
-                                # 新状态
-                                progress = (downloaded / total_size) * 100
-                                self.status_label.setText(f'下载进度: {progress:.1f}%')
-                                
-                    QMessageBox.information(self, '成功', '音乐下载完成！')
-                    self.status_label.setText('下载完成')
-                else:
-                    raise Exception('下载失败')
-                
-        except Exception as e:
-            QMessageBox.warning(self, '错误', f'下载失败：{str(e)}')
-            self.status_label.setText('下载失败')
+        # 正在下载的歌曲再次点击下载按钮时询问是否取消
+        task_id = self.downloader.find_task(self.current_music_url)
+        if task_id is not None:
+            reply = QMessageBox.question(self, '提示', '该音乐正在下载，是否取消下载？')
+            if reply == QMessageBox.Yes:
+                self.downloader.cancel(task_id)
+            return
+        
+        # 获取保存路径
+        file_name = self.playing_status.text().replace('正在播放: ', '').replace('/', '_') + '.mp3'
+        save_path, _ = QFileDialog.getSaveFileName(
+            self, 
+            '保存音乐', 
+            file_name,
+            'MP3 文件 (*.mp3)'
+        )
+        
+        if save_path:
+            # 交给下载管理器在后台下载
+            self.downloader.add_download(self.current_music_url, save_path)
+            self.status_label.setText('已加入下载队列')
+
+    def on_download_progress(self, task_id, downloaded, total):
+        if total:
+            progress = (downloaded / total) * 100
+            self.status_label.setText(f'下载进度: {progress:.1f}%')
+        else:
+            self.status_label.setText(f'已下载: {downloaded / 1024 / 1024:.1f} MB')
+
+    def on_download_finished(self, task_id, save_path):
+        self.status_label.setText('下载完成')
+        QMessageBox.information(self, '成功', '音乐下载完成！')
+
+    def on_download_failed(self, task_id, error):
+        self.status_label.setText('下载失败')
+        QMessageBox.warning(self, '错误', f'下载失败：{error}')
+
+    def on_download_cancelled(self, task_id):
+        self.status_label.setText('下载已取消')
 
     def toggle_play_mode(self):
         if self.play_mode == 'sequence':
@@ -1198,10 +2749,9 @@ class MusicPlayer(QMainWindow):
                 self.player.play()
             else:
                 # 顺序播放模式：播放下一首
-                current_row = self.online_list.currentRow()
-                if current_row < self.online_list.count() - 1:
-                    self.online_list.setCurrentRow(current_row + 1)
-                    self.play_online_music(self.online_list.currentItem())
+                current_row = self.current_row()
+                if current_row < self.song_model.rowCount() - 1:
+                    self.play_row(current_row + 1)
                 else:
                     # 已经是最后一首，停止播放
                     self.player.stop()
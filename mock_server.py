@@ -0,0 +1,249 @@
+"""本地模拟的 mg_music 接口，用于离线测试和基准测试
+
+返回与线上接口相同格式的搜索文本和详情 JSON，并提供合成的 LRC 歌词、
+PNG 封面和静音 MP3（支持 Range 请求），可配置延迟和失败率。
+
+用法: python mock_server.py --port 8765 --latency 50 --failure-rate 0.05
+然后在 config.json 中设置 "api_base": "http://127.0.0.1:8765/api/mg_music/"
+"""
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+API_PATH = '/api/mg_music/'
+PAGE_SIZE = 20
+
+# MPEG-1 Layer III, 128kbps, 44.1kHz 的静音帧，每帧约 26ms
+MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def song_id(title, index):
+    return hashlib.sha1(f'{title}#{index}'.encode('utf-8')).hexdigest()[:12]
+
+
+def make_lrc(title, lines=60):
+    out = [f'[ti:{title}]', '[ar:模拟歌手]']
+    for i in range(lines):
+        t = i * 3000 + 500
+        out.append(f'[{t // 60000:02d}:{t // 1000 % 60:02d}.{t % 1000 // 10:02d}]{title} 第{i + 1}行')
+    return '\n'.join(out) + '\n'
+
+
+def make_png(seed, size=500):
+    """生成渐变色 PNG，seed 不同颜色不同"""
+    rows = []
+    for y in range(size):
+        row = bytearray(b'\x00')
+        for x in range(size):
+            row += bytes(((x + seed * 37) % 256, (y + seed * 71) % 256, ((x + y) // 2) % 256))
+        rows.append(bytes(row))
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(b''.join(rows), 6)) + chunk(b'IEND', b''))
+
+
+class MockState:
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, results=PAGE_SIZE,
+                 pages=3, song_seconds=30, seed=None):
+        self.latency = latency  # 秒
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.results = results
+        self.pages = pages
+        self.song_seconds = song_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.covers = {}
+        self.requests = 0
+        self.failures = 0
+        self.bytes_sent = 0
+
+    def delay(self):
+        with self.lock:
+            extra = self.random.uniform(0, self.jitter) if self.jitter else 0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            failed = self.failure_rate > 0 and self.random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+            return failed
+
+    def cover(self, seed):
+        seed %= 16  # 只生成 16 种封面，模拟不同歌曲共用专辑图
+        with self.lock:
+            data = self.covers.get(seed)
+        if data is None:
+            data = make_png(seed)
+            with self.lock:
+                self.covers[seed] = data
+        return data
+
+    def audio_size(self):
+        return int(self.song_seconds / MP3_FRAME_SECONDS) * len(MP3_FRAME)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持 keep-alive
+    state = None  # 由 MockMusicServer 设置
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type, extra_headers=None):
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前断开（搜索被取消、读超时、断点续传），属于正常情况
+            self.close_connection = True
+            return
+        with self.state.lock:
+            self.state.bytes_sent += len(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.state.delay()
+        if self.state.should_fail():
+            self.send_body(503, b'Service Unavailable', 'text/plain')
+            return
+        url = urlparse(self.path)
+        base = f'http://{self.headers.get("Host")}'
+        if url.path == API_PATH:
+            self.handle_api(parse_qs(url.query), base)
+        elif url.path.startswith('/lrc/'):
+            title = parse_qs(url.query).get('t', ['模拟歌曲'])[0]
+            self.send_body(200, make_lrc(title).encode('utf-8'), 'text/plain; charset=utf-8')
+        elif url.path.startswith('/cover/'):
+            seed = int(url.path.rsplit('/', 1)[-1].split('.')[0], 16)
+            self.send_body(200, self.state.cover(seed), 'image/png')
+        elif url.path.startswith('/audio/'):
+            self.handle_audio()
+        else:
+            self.send_body(404, b'Not Found', 'text/plain')
+
+    def handle_api(self, query, base):
+        keyword = query.get('msg', [''])[0]
+        if 'n' in query:
+            index = int(query['n'][0])
+            sid = song_id(keyword, index)
+            data = {
+                'code': 200,
+                'msg': 'success',
+                'data': {
+                    'title': keyword,
+                    'singer': '模拟歌手',
+                    'music_url': f'{base}/audio/{sid}.mp3',
+                    'lrc_url': f'{base}/lrc/{sid}.lrc?t={quote(keyword)}',
+                    'cover': f'{base}/cover/{sid}.png',
+                }
+            }
+            self.send_body(200, json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                           'application/json; charset=utf-8')
+            return
+
+        page = int(query.get('page', ['1'])[0])
+        if not keyword or page > self.state.pages:
+            self.send_body(200, '未找到相关歌曲'.encode('utf-8'), 'text/plain; charset=utf-8')
+            return
+        start = (page - 1) * self.state.results
+        lines = [f'{i + 1}. {keyword}的歌{start + i + 1} -- {keyword}' for i in range(self.state.results)]
+        self.send_body(200, '\n'.join(lines).encode('utf-8'), 'text/plain; charset=utf-8')
+
+    def handle_audio(self):
+        size = self.state.audio_size()
+        start, end = 0, size - 1
+        status = 200
+        headers = {'Accept-Ranges': 'bytes'}
+        header = self.headers.get('Range')
+        if header and header.startswith('bytes='):
+            first, _, last = header[6:].partition('-')
+            start = int(first or 0)
+            end = min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                self.send_body(416, b'', 'audio/mpeg', {'Content-Range': f'bytes */{size}'})
+                return
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        frames = MP3_FRAME * (end // len(MP3_FRAME) + 1)
+        self.send_body(status, frames[start:end + 1], 'audio/mpeg', headers)
+
+
+class MockMusicServer:
+    """在后台线程运行的模拟服务器，base_url 可直接作为 MgMusicSource 的接口地址"""
+    def __init__(self, host='127.0.0.1', port=0, **options):
+        self.state = MockState(**options)
+        handler = type('BoundMockHandler', (MockHandler,), {'state': self.state})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}{API_PATH}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 mg_music 接口')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='每个请求的固定延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0, help='额外随机延迟上限（毫秒）')
+    parser.add_argument('--failure-rate', type=float, default=0, help='返回 503 的概率')
+    parser.add_argument('--song-seconds', type=float, default=30, help='合成音频时长（秒）')
+    args = parser.parse_args()
+
+    server = MockMusicServer(args.host, args.port, latency=args.latency / 1000,
+                             jitter=args.jitter / 1000, failure_rate=args.failure_rate,
+                             song_seconds=args.song_seconds)
+    print(f'模拟接口已启动: {server.base_url}')
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
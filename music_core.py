@@ -0,0 +1,895 @@
+"""不依赖 PyQt5 的核心部分：配置、网络会话、音乐源、歌词解析、文件下载和命令行批量下载
+
+界面程序 main.py 从这里导入这些功能；批量下载只需要本模块，可以在没有显示器和音频库的服务器上运行。
+"""
+import time
+import sys
+import os
+import re
+import random
+import json
+import argparse
+import threading
+import socket
+import requests
+from array import array
+from operator import itemgetter, lt
+from urllib.parse import urlparse, parse_qs
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import urllib3
+import warnings
+from requests.packages.urllib3.exceptions import InsecureRequestWarning
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# 禁用 SSL 警告
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+warnings.simplefilter('ignore', InsecureRequestWarning)
+
+# 默认配置，可在 config.json 中覆盖
+DEFAULT_CONFIG = {
+    "theme": "dark",
+    "cache_path": "./cache",
+    "download_path": "./downloads",
+    "max_cache_size": 1024,
+    "audio_cache_size": 2048,
+    "api_timeout": 30,
+    "api_base": "https://api.cenguigui.cn/api/mg_music/",
+    "download_concurrency": 2,
+    "url_ttl": 1800,
+    "search_ttl": 300,
+    "loader_workers": 3,
+    "connect_timeout": 5,
+    "max_retries": 3,
+    "max_connections_per_host": 6,
+    "prefetch_ratio": 0.7,
+    "max_fps": 60,
+    "battery_fps": 30,
+    "cover_angle_step": 2.0,
+    "cover_sprite_budget": 64,
+    "trace_events": 10000,
+    "trace_file": "",
+    "stall_threshold_ms": 200
+}
+
+def load_config(path='config.json'):
+    """读取配置文件，缺失的项使用默认值"""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"读取配置文件失败：{str(e)}")
+    return config
+
+CONFIG = load_config()
+
+class Tracer:
+    """轻量的耗时统计：保留最近 trace_events 个计时区间和若干计数器，可导出为 Chrome trace"""
+    def __init__(self, capacity=None):
+        capacity = CONFIG['trace_events'] if capacity is None else capacity
+        self.enabled = capacity > 0
+        self.events = deque(maxlen=max(capacity, 1))  # (名称, 类别, 开始时间, 耗时, 线程号)
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, category='app'):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter() - started, category)
+
+    def record(self, name, started, duration, category='app'):
+        if self.enabled:
+            # deque.append 本身是线程安全的，不需要加锁
+            self.events.append((name, category, started, duration, threading.get_ident()))
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self, window=5.0):
+        """最近 window 秒内每种区间的次数、平均耗时和最大耗时（毫秒）"""
+        cutoff = time.perf_counter() - window
+        stats = {}
+        for name, _, started, duration, _ in self.events.copy():
+            if started < cutoff:
+                continue
+            count, total, peak = stats.get(name, (0, 0.0, 0.0))
+            stats[name] = (count + 1, total + duration, max(peak, duration))
+        return {
+            name: {'count': count, 'avg_ms': total / count * 1000, 'max_ms': peak * 1000}
+            for name, (count, total, peak) in stats.items()
+        }
+
+    def dump_chrome_trace(self, path):
+        """写出可在 chrome://tracing 或 Perfetto 中打开的 JSON"""
+        pid = os.getpid()
+        events = [{
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (started - self.origin) * 1e6,
+            'dur': duration * 1e6,
+            'pid': pid,
+            'tid': tid
+        } for name, category, started, duration, tid in self.events.copy()]
+        with self.lock:
+            counters = dict(self.counters)
+        events.append({
+            'name': 'counters',
+            'ph': 'C',
+            'ts': (time.perf_counter() - self.origin) * 1e6,
+            'pid': pid,
+            'args': counters
+        })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+tracer = Tracer()
+
+class JitterRetry(Retry):
+    """指数退避的基础上加入随机抖动，避免多个请求在同一时刻重试"""
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return backoff + random.uniform(0, backoff)
+
+def shutdown_socket(sock):
+    # 只关闭底层套接字，不调用 SSLSocket.shutdown，避免和正在读取的线程争用 SSL 状态
+    try:
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+class CancelToken:
+    """可以中断网络请求的取消标志，用法与 threading.Event 相同
+
+    把它传给 http_get 后，set() 会关闭该请求正在使用的连接，阻塞在等待响应上的线程立即出错返回。
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.connections = set()
+
+    def is_set(self):
+        return self.event.is_set()
+
+    def set(self):
+        self.event.set()
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            if conn.sock is not None:
+                shutdown_socket(conn.sock)
+
+    def attach(self, conn):
+        conn.cancel_token = self
+        with self.lock:
+            self.connections.add(conn)
+        if self.event.is_set() and conn.sock is not None:
+            shutdown_socket(conn.sock)
+
+    def detach(self, conn):
+        conn.cancel_token = None
+        with self.lock:
+            self.connections.discard(conn)
+
+# 当前线程正在发出的请求所用的 CancelToken，由连接池在取出连接时读取
+request_context = threading.local()
+
+class CancellableConnectionMixin:
+    cancel_token = None
+
+    def connect(self):
+        super().connect()
+        # 建立连接期间已被取消
+        if self.cancel_token is not None and self.cancel_token.is_set():
+            shutdown_socket(self.sock)
+
+class CancellableHTTPConnection(CancellableConnectionMixin, HTTPConnection):
+    pass
+
+class CancellableHTTPSConnection(CancellableConnectionMixin, HTTPSConnection):
+    pass
+
+class CancellablePoolMixin:
+    """取出连接时关联当前请求的 CancelToken，放回连接池时解除关联，之后的请求不会被误关闭"""
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        token = getattr(request_context, 'cancel_token', None)
+        if token is not None:
+            token.attach(conn)
+        return conn
+
+    def _put_conn(self, conn):
+        token = getattr(conn, 'cancel_token', None)
+        if token is not None:
+            token.detach(conn)
+        super()._put_conn(conn)
+
+class CancellableHTTPConnectionPool(CancellablePoolMixin, HTTPConnectionPool):
+    ConnectionCls = CancellableHTTPConnection
+
+class CancellableHTTPSConnectionPool(CancellablePoolMixin, HTTPSConnectionPool):
+    ConnectionCls = CancellableHTTPSConnection
+
+class SessionAdapter(HTTPAdapter):
+    """连接池中的连接可以被 CancelToken 关闭"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CancellableHTTPConnectionPool,
+            'https': CancellableHTTPSConnectionPool
+        }
+
+http_sessions = {}  # 是否重试读超时 -> 会话
+http_session_lock = threading.Lock()
+
+def get_session(retry_reads=True):
+    """返回全局共享的 HTTP 会话，所有网络请求复用连接池
+
+    retry_reads=False 时读超时不重试，供有总时限的请求（例如搜索）使用，避免重试把等待时间放大几倍
+    """
+    with http_session_lock:
+        session = http_sessions.get(retry_reads)
+        if session is None:
+            retry = JitterRetry(
+                total=CONFIG['max_retries'],
+                read=None if retry_reads else 0,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                raise_on_status=False
+            )
+            # pool_maxsize 是每个主机保留复用的连接数；都在使用时临时新建连接，用完后关闭，
+            # 不排队等待，卡住的请求不会拖住同一主机上的其他请求
+            adapter = SessionAdapter(pool_connections=8,
+                                     pool_maxsize=CONFIG['max_connections_per_host'],
+                                     max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.verify = False  # 禁用SSL验证
+            http_sessions[retry_reads] = session
+        return session
+
+def http_timeout(read_timeout=None):
+    return (CONFIG['connect_timeout'], read_timeout or CONFIG['api_timeout'])
+
+def http_get(url, retry_reads=True, cancel_token=None, **kwargs):
+    """使用共享会话和统一超时发起 GET 请求，传入 cancel_token 时可以从其他线程中断"""
+    kwargs.setdefault('timeout', http_timeout())
+    request_context.cancel_token = cancel_token
+    try:
+        with tracer.span('http', 'network'):
+            return get_session(retry_reads).get(url, **kwargs)
+    finally:
+        request_context.cancel_token = None
+
+def normalize_text(text):
+    return ' '.join(text.lower().split())
+
+# 播放地址中常见的过期时间参数（Unix 时间戳）
+URL_EXPIRY_PARAMS = ('expires', 'expire', 'x-expires', 'deadline', 'e')
+URL_EXPIRY_MARGIN = 60  # 提前一分钟视为过期，避免播放到一半失效
+
+def detail_expiry(song_data):
+    """返回歌曲详情的过期时间：默认 url_ttl，播放地址自带过期参数时取较早者"""
+    now = time.time()
+    expires = now + CONFIG['url_ttl']
+    query = parse_qs(urlparse(song_data.get('music_url') or '').query)
+    for name, values in query.items():
+        if name.lower() not in URL_EXPIRY_PARAMS:
+            continue
+        try:
+            stamp = int(values[0])
+        except ValueError:
+            continue
+        if stamp > 10 ** 12:
+            stamp //= 1000  # 毫秒时间戳
+        if now < stamp < expires + URL_EXPIRY_MARGIN:
+            expires = stamp - URL_EXPIRY_MARGIN
+    return expires
+
+class MusicSource:
+    """音乐源接口：界面只通过它搜索、解析播放地址、获取歌词和封面"""
+    name = 'base'
+
+    def search(self, keyword, page=1, cancel_event=None):
+        """返回 [(歌名, 歌手, 序号), ...]，被 cancel_event 取消时返回 None"""
+        raise NotImplementedError
+
+    def song_key(self, title, singer):
+        """歌曲的稳定标识，不随搜索结果中的序号变化，用作详情缓存键"""
+        return f'{self.name}:{normalize_text(title)}|{normalize_text(singer)}'
+
+    def resolve(self, title, index):
+        """返回包含 music_url、lrc_url、cover 的歌曲详情"""
+        raise NotImplementedError
+
+    def fetch_lyrics(self, url):
+        response = http_get(url)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        return response.text
+
+    def fetch_cover(self, url):
+        response = http_get(url)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        return response.content
+
+class MgMusicSource(MusicSource):
+    """咪咕音乐接口，搜索结果为 "1. 歌名 -- 歌手" 格式的文本，详情为 JSON"""
+    name = 'mg_music'
+
+    def __init__(self, base_url=None, timeout=None):
+        self.base_url = base_url or CONFIG['api_base']
+        self.timeout = timeout or CONFIG['api_timeout']
+
+    def search(self, keyword, page=1, cancel_event=None):
+        # 整次搜索最多 timeout 秒：读超时不重试，分块读取响应，每块之间检查是否已被取消
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        params = {'msg': keyword, 'type': 'json'}
+        if page > 1:
+            params['page'] = page
+        # CancelToken 被取消时直接关闭连接，不用等到服务器响应
+        cancel_token = cancel_event if isinstance(cancel_event, CancelToken) else None
+        deadline = time.monotonic() + self.timeout
+        connect_timeout = min(CONFIG['connect_timeout'], self.timeout)
+        try:
+            with http_get(self.base_url, retry_reads=False, cancel_token=cancel_token, params=params,
+                          stream=True, timeout=(connect_timeout, self.timeout)) as response:
+                # 读取响应体时每次只等待剩余的时间
+                sock = getattr(response.raw.connection, 'sock', None)
+                chunks = []
+                for chunk in response.iter_content(chunk_size=8192):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise requests.Timeout('搜索超时')
+                    if sock is not None:
+                        sock.settimeout(remaining)
+                    chunks.append(chunk)
+                text_response = b''.join(chunks).decode(response.encoding or 'utf-8', errors='replace')
+        except requests.RequestException:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            if time.monotonic() >= deadline:
+                raise requests.Timeout('搜索超时')
+            raise
+        if cancel_event is not None and cancel_event.is_set():
+            return None  # 连接被关闭时响应可能不完整
+        if page > 1 and not text_response.startswith('1.'):
+            return []  # 超出最后一页
+        return self.parse_songs(text_response)
+
+    def parse_songs(self, text_response):
+        """解析 "1. 歌名 -- 歌手" 格式的搜索结果"""
+        if not text_response.startswith('1.'):
+            raise Exception('搜索失败，请稍后重试！')
+        songs = []
+        for i, song in enumerate(text_response.strip().split('\n'), 1):
+            if ' -- ' in song:
+                song_info = song.split('.', 1)[1].strip()
+                title, singer = song_info.split(' -- ', 1)
+                songs.append((title, singer, i))
+        return songs
+
+    def resolve(self, title, index):
+        response = http_get(self.base_url, params={'msg': title, 'n': index, 'type': 'json'})
+        
+        if response.status_code != 200:
+            raise Exception(f"API请求失败: {response.status_code}")
+        
+        data = response.json()
+        
+        if data.get('code') != 200:
+            raise Exception(f"API返回错误: {data.get('msg', '未知错误')}")
+        
+        song_data = data.get('data')
+        if not song_data:
+            raise Exception("未获取到歌曲数据")
+        return song_data
+
+class FailoverSource(MusicSource):
+    """按顺序尝试多个音乐源，前一个出错时换下一个"""
+    name = 'failover'
+
+    def __init__(self, sources):
+        self.sources = sources
+
+    def call(self, method, *args, **kwargs):
+        errors = []
+        for source in self.sources:
+            try:
+                return getattr(source, method)(*args, **kwargs)
+            except Exception as e:
+                errors.append(f'{source.name}: {str(e)}')
+        raise Exception('; '.join(errors))
+
+    def search(self, keyword, page=1, cancel_event=None):
+        return self.call('search', keyword, page, cancel_event)
+
+    def song_key(self, title, singer):
+        return self.sources[0].song_key(title, singer)
+
+    def resolve(self, title, index):
+        return self.call('resolve', title, index)
+
+    def fetch_lyrics(self, url):
+        return self.call('fetch_lyrics', url)
+
+    def fetch_cover(self, url):
+        return self.call('fetch_cover', url)
+
+LRC_SIMPLE_LINE = re.compile(r'\s*\[(\d\d):(\d\d)\.(\d\d)\]([^\[<]*)$')  # 最常见的单标签行
+LRC_TIME_TAG = re.compile(r'\[(\d+):(\d{1,2})(?:[.:](\d{1,3}))?\]')
+LRC_WORD_TAG = re.compile(r'<(\d+):(\d{1,2})(?:[.:](\d{1,3}))?>')
+LRC_META_TAG = re.compile(r'^\[([A-Za-z#]+):(.*)\]$')
+# 整篇解析用：单标签行、所有以时间标签开头的行、元数据行
+# 以换行符而不是 ^ 开头，正则引擎可以直接跳到下一个换行处匹配，文本前需补一个换行符
+LRC_SIMPLE_LINES = re.compile(r'\n[ \t]*\[([0-9]{2}):([0-9]{2})\.([0-9]{2})\]([^\[<\n]*)(?![^\n])')
+LRC_TIMED_LINES = re.compile(r'\n[ \t]*\[\d')
+LRC_META_LINES = re.compile(r'\n[ \t]*\[([A-Za-z#]+):([^\n]*)\][ \t\r]*(?![^\n])')
+# 两位数字 -> 毫秒，快速路径查表代替 int()
+LRC_MINUTE_MS = {f'{i:02d}': i * 60000 for i in range(100)}
+LRC_SECOND_MS = {f'{i:02d}': i * 1000 for i in range(100)}
+LRC_CENTI_MS = {f'{i:02d}': i * 10 for i in range(100)}
+
+def lrc_time(minutes, seconds, fraction):
+    """把时间标签换算成毫秒，小数部分按位数区分 1/10、1/100 和 1/1000 秒"""
+    ms = int(minutes) * 60000 + int(seconds) * 1000
+    if fraction:
+        ms += int(fraction) * 10 ** (3 - len(fraction))
+    return ms
+
+class Lyrics:
+    """解析后的歌词，时间戳存放在 array 中，文本、翻译和逐字时间按行对应"""
+    __slots__ = ('times', 'texts', 'translations', 'words', 'meta')
+
+    def __init__(self):
+        self.times = array('i')
+        self.texts = []
+        self.translations = []  # 没有翻译的行为 None
+        self.words = []  # 增强格式的逐字时间 [(毫秒, 文字), ...]，没有时为 None
+        self.meta = {}  # ti/ar/al/by/offset 等标签
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self):
+        return zip(self.times, self.texts)
+
+    def __getitem__(self, index):
+        return self.times[index], self.texts[index]
+
+    def nbytes(self):
+        """近似内存占用，供缓存计算容量"""
+        size = self.times.itemsize * len(self.times) + sys.getsizeof(self.texts)
+        size += sum(sys.getsizeof(text) for text in self.texts)
+        size += sum(sys.getsizeof(text) for text in self.translations if text)
+        size += sum(64 * len(words) for words in self.words if words)
+        return size
+
+def lrc_offset(meta):
+    # offset 为正表示歌词提前显示
+    try:
+        return int(meta.get('offset', 0))
+    except ValueError:
+        return 0
+
+def parse_simple_lrc(text):
+    """普通歌词的快速路径：每行只有一个 [mm:ss.xx] 标签且时间递增时，整篇用正则一次解析
+
+    不满足条件（多时间标签、逐字时间、双语、乱序等）时返回 None，由 parse_lrc 逐行解析。
+    """
+    text = '\n' + text
+    lines = LRC_SIMPLE_LINES.findall(text)
+    if not lines or len(lines) != len(LRC_TIMED_LINES.findall(text)):
+        return None
+    times = [LRC_MINUTE_MS[minutes] + LRC_SECOND_MS[seconds] + LRC_CENTI_MS[centis]
+             for minutes, seconds, centis, _ in lines]
+    texts = [line[3].strip() for line in lines]
+    if '' in texts:
+        # 没有文字的行（常用作间奏）不显示
+        keep = [i for i, line_text in enumerate(texts) if line_text]
+        times = [times[i] for i in keep]
+        texts = [texts[i] for i in keep]
+    if not all(map(lt, times, times[1:])):
+        return None
+    
+    lyrics = Lyrics()
+    lyrics.meta = {name.lower(): value.strip() for name, value in LRC_META_LINES.findall(text)}
+    offset = lrc_offset(lyrics.meta)
+    if offset:
+        times = [time_ms - offset if time_ms > offset else 0 for time_ms in times]
+    lyrics.times = array('i', times)
+    lyrics.texts = texts
+    lyrics.translations = [None] * len(texts)
+    lyrics.words = [None] * len(texts)
+    return lyrics
+
+def parse_lrc(source):
+    """解析 LRC 歌词，source 可以是完整文本或逐行迭代的文本流
+
+    支持一行多个时间标签、1~3 位小数、[offset:] 等元数据标签、
+    增强格式的 <mm:ss.xx> 逐字时间，以及相同时间戳的双语歌词（第二行作为翻译）
+    """
+    if isinstance(source, str):
+        lyrics = parse_simple_lrc(source)
+        if lyrics is not None:
+            return lyrics
+        source = source.splitlines()
+    
+    entries = []  # (时间, 文本, 逐字时间)
+    meta = {}
+    last_time = -1
+    ordered = True  # 多数歌词按时间顺序书写，已有序时跳过排序
+    for line in source:
+        match = LRC_SIMPLE_LINE.match(line)
+        if match is not None:
+            # 常见的单个 [mm:ss.xx] 标签且没有逐字时间，直接换算
+            minutes, seconds, centis, text = match.groups()
+            text = text.strip()
+            if text:
+                time_ms = int(minutes) * 60000 + int(seconds) * 1000 + int(centis) * 10
+                if time_ms < last_time:
+                    ordered = False
+                last_time = time_ms
+                entries.append((time_ms, text, None))
+            continue
+        
+        line = line.strip()
+        times = []
+        pos = 0
+        tag = LRC_TIME_TAG.match(line)
+        while tag is not None:
+            times.append(lrc_time(*tag.groups()))
+            pos = tag.end()
+            tag = LRC_TIME_TAG.match(line, pos)
+        if not times:
+            meta_match = LRC_META_TAG.match(line)
+            if meta_match:
+                meta[meta_match.group(1).lower()] = meta_match.group(2).strip()
+            continue
+        
+        text = line[pos:]
+        words = None
+        if '<' in text:
+            # 增强格式：记录每个字的开始时间，显示文本去掉标签
+            parts = LRC_WORD_TAG.split(text)
+            if len(parts) > 1:
+                words = [(lrc_time(*parts[i:i + 3]), parts[i + 3])
+                         for i in range(1, len(parts) - 3, 4) if parts[i + 3].strip()]
+                text = ''.join(parts[0::4])
+        text = text.strip()
+        if not text:
+            continue
+        for time_ms in times:
+            if time_ms < last_time:
+                ordered = False
+            last_time = time_ms
+            entries.append((time_ms, text, words))
+    
+    if not ordered:
+        # 稳定排序，相同时间戳的行保持原文顺序
+        entries.sort(key=itemgetter(0))
+    
+    offset = lrc_offset(meta)
+    
+    lyrics = Lyrics()
+    lyrics.meta = meta
+    times, texts, translations = lyrics.times, lyrics.texts, lyrics.translations
+    last_time = None
+    for time_ms, text, words in entries:
+        if time_ms == last_time:
+            # 相同时间戳的第二行作为翻译
+            if translations[-1] is None and text != texts[-1]:
+                translations[-1] = text
+            continue
+        last_time = time_ms
+        times.append(time_ms - offset if time_ms > offset else 0)
+        texts.append(text)
+        translations.append(None)
+        if words and offset:
+            words = [(max(t - offset, 0), word) for t, word in words]
+        lyrics.words.append(words)
+    return lyrics
+
+class DownloadCancelled(Exception):
+    pass
+
+DOWNLOAD_MIN_CHUNK = 64 * 1024  # 自适应块大小下限
+DOWNLOAD_MAX_CHUNK = 1024 * 1024  # 自适应块大小上限
+
+def download_file(url, save_path, cancel_event=None, progress_callback=None,
+                  retries=3, timeout=None, progress_interval=0.2):
+    """下载文件到 save_path，连接中断时通过 Range 请求从 .part 文件续传"""
+    part_path = save_path + '.part'
+    failures = 0
+    last_report = 0
+    while True:
+        downloaded = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Accept-Encoding': 'identity'}
+        if downloaded:
+            headers['Range'] = f'bytes={downloaded}-'
+        progressed = False
+        try:
+            with http_get(url, headers=headers, stream=True,
+                          timeout=http_timeout(timeout)) as response:
+                if response.status_code == 416 and downloaded:
+                    # 服务器认为已经没有剩余内容，说明上次已下载完整
+                    break
+                if response.status_code == 206:
+                    start, total = parse_content_range(response.headers.get('content-range', ''))
+                    if start != downloaded:
+                        # 服务器返回的区间对不上，从头重新下载
+                        downloaded = 0
+                        os.remove(part_path)
+                        continue
+                    mode = 'ab'
+                elif response.status_code == 200:
+                    # 服务器不支持续传，从头下载
+                    downloaded = 0
+                    total = int(response.headers.get('content-length', 0))
+                    mode = 'wb'
+                else:
+                    raise Exception(f'下载失败: HTTP {response.status_code}')
+                
+                chunk_size = DOWNLOAD_MIN_CHUNK
+                with open(part_path, mode) as file:
+                    while True:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise DownloadCancelled()
+                        started = time.monotonic()
+                        data = response.raw.read(chunk_size, decode_content=True)
+                        if not data:
+                            break
+                        file.write(data)
+                        downloaded += len(data)
+                        progressed = True
+                        
+                        # 根据单块读取耗时调整块大小：网速快就读大块，慢就读小块
+                        elapsed = time.monotonic() - started
+                        if elapsed < 0.05:
+                            chunk_size = min(chunk_size * 2, DOWNLOAD_MAX_CHUNK)
+                        elif elapsed > 0.5:
+                            chunk_size = max(chunk_size // 2, DOWNLOAD_MIN_CHUNK)
+                        
+                        # 限制进度回调频率
+                        now = time.monotonic()
+                        if progress_callback and now - last_report >= progress_interval:
+                            last_report = now
+                            progress_callback(downloaded, total)
+                
+                if total and downloaded < total:
+                    raise requests.ConnectionError(f'连接中断：已下载 {downloaded}/{total} 字节')
+                break
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            failures = 0 if progressed else failures + 1
+            if failures >= retries:
+                raise Exception(f'已重试{retries}次：{str(e)}')
+            # 退避后续传，与共享会话的重试策略一致
+            time.sleep(0.5 * (2 ** failures) * random.uniform(1, 2))
+    
+    os.replace(part_path, save_path)
+    if progress_callback:
+        progress_callback(downloaded, downloaded)
+    return downloaded
+
+def parse_content_range(content_range):
+    """解析 "bytes start-end/total"，返回 (start, total)，total 未知时为 0"""
+    try:
+        unit, spec = content_range.split(' ', 1)
+        byte_range, total = spec.split('/', 1)
+        start = int(byte_range.split('-', 1)[0])
+        return start, (0 if total == '*' else int(total))
+    except ValueError:
+        return -1, 0
+
+class RateLimiter:
+    """按主机限制请求频率，每个主机每秒最多 rate 个请求"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_time = {}  # 主机 -> 下一个请求允许发出的时间
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time.get(host, now))
+            self.next_time[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class BatchDownloader:
+    """不创建窗口的批量下载：按关键词搜索、获取详情并下载，进度保存在状态文件中可随时中断续传"""
+    def __init__(self, output_dir, limit=10, concurrency=None, rate=2.0,
+                 state_path=None, source=None):
+        self.output_dir = output_dir
+        self.limit = limit
+        self.concurrency = concurrency or CONFIG['download_concurrency']
+        self.source = source or MgMusicSource()
+        self.api_url = getattr(self.source, 'base_url', CONFIG['api_base'])
+        self.limiter = RateLimiter(rate)
+        self.state_path = state_path or os.path.join(output_dir, 'batch_state.json')
+        self.state = {}  # 歌曲标识 -> {'title', 'singer', 'status', 'path', 'size', 'error'}
+        self.lock = threading.Lock()
+        self.cancel_event = threading.Event()
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = {}
+        except (OSError, ValueError) as e:
+            print(f"状态文件损坏，重新开始：{str(e)}")
+            self.state = {}
+
+    def save_state(self):
+        with self.lock:
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def collect(self, keyword):
+        """返回该关键词下最多 limit 首歌曲，结果不足一页时继续翻页"""
+        songs = []
+        seen = set()
+        page = 1
+        while len(songs) < self.limit:
+            self.limiter.wait(self.api_url)
+            found = [song for song in self.source.search(keyword, page) or [] if song[:2] not in seen]
+            if not found:
+                break
+            for song in found:
+                seen.add(song[:2])
+            songs.extend(found)
+            page += 1
+        return songs[:self.limit]
+
+    def file_path(self, title, singer, taken=()):
+        """保存路径，与 taken 中已分配的路径重名时在文件名后加序号"""
+        name = f'{title} - {singer}'
+        for char in '\\/:*?"<>|':
+            name = name.replace(char, '_')
+        path = os.path.join(self.output_dir, name + '.mp3')
+        number = 2
+        while path in taken:
+            path = os.path.join(self.output_dir, f'{name} ({number}).mp3')
+            number += 1
+        return path
+
+    def download(self, key, title, singer, index):
+        entry = self.state[key]
+        try:
+            self.limiter.wait(self.api_url)
+            song_data = self.source.resolve(title, index)
+            music_url = song_data.get('music_url')
+            if not music_url:
+                raise Exception('未获取到音乐URL')
+            self.limiter.wait(music_url)
+            entry['size'] = download_file(music_url, entry['path'], self.cancel_event)
+            entry['status'] = 'done'
+            entry['error'] = None
+            print(f"完成：{title} - {singer}")
+        except DownloadCancelled:
+            return
+        except Exception as e:
+            entry['status'] = 'failed'
+            entry['error'] = str(e)
+            print(f"失败：{title} - {singer}：{str(e)}")
+        self.save_state()
+
+    def run(self, keywords):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.load_state()
+        started = time.time()
+        
+        jobs = []
+        queued = set()  # 不同关键词搜到同一首歌时只下载一次
+        taken = {entry['path'] for entry in self.state.values()}  # 两个任务不能写同一个文件
+        for keyword in keywords:
+            try:
+                songs = self.collect(keyword)
+            except Exception as e:
+                print(f"搜索失败：{keyword}：{str(e)}")
+                continue
+            for title, singer, index in songs:
+                key = self.source.song_key(title, singer)
+                if key in queued:
+                    continue
+                entry = self.state.get(key)
+                if entry and entry['status'] == 'done' and os.path.exists(entry['path']):
+                    continue  # 上次已下载完成
+                if entry:
+                    path = entry['path']  # 沿用上次的路径，未完成的 .part 可以续传
+                else:
+                    path = self.file_path(title, singer, taken)
+                    taken.add(path)
+                queued.add(key)
+                self.state[key] = {
+                    'keyword': keyword,
+                    'title': title,
+                    'singer': singer,
+                    'status': 'pending',
+                    'path': path,
+                    'size': 0,
+                    'error': None
+                }
+                jobs.append((key, title, singer, index))
+        self.save_state()
+        print(f"共 {len(jobs)} 首待下载")
+        
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        futures = [executor.submit(self.download, *job) for job in jobs]
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # 未完成的 .part 文件会在下次运行时续传
+            self.cancel_event.set()
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown()
+        return self.report(time.time() - started)
+
+    def report(self, elapsed):
+        entries = list(self.state.values())
+        done = [entry for entry in entries if entry['status'] == 'done']
+        return {
+            'elapsed': round(elapsed, 2),
+            'total': len(entries),
+            'done': len(done),
+            'failed': sum(1 for entry in entries if entry['status'] == 'failed'),
+            'bytes': sum(entry['size'] for entry in done),
+            'songs': entries
+        }
+
+def run_batch(argv):
+    parser = argparse.ArgumentParser(prog='main.py --batch', description='按关键词批量下载音乐')
+    parser.add_argument('--batch', required=True, metavar='FILE', help='关键词文件，每行一个歌名或歌手，# 开头为注释')
+    parser.add_argument('--output', default=CONFIG['download_path'], help='保存目录')
+    parser.add_argument('--limit', type=int, default=10, help='每个关键词最多下载的歌曲数')
+    parser.add_argument('--concurrency', type=int, default=CONFIG['download_concurrency'], help='同时下载的歌曲数')
+    parser.add_argument('--rate', type=float, default=2.0, help='每个主机每秒最多请求数，0 表示不限制')
+    parser.add_argument('--state', help='状态文件，默认保存在输出目录中')
+    parser.add_argument('--report', help='把 JSON 报告写入该文件，默认输出到标准输出')
+    args = parser.parse_args(argv)
+    
+    with open(args.batch, 'r', encoding='utf-8') as f:
+        keywords = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    
+    downloader = BatchDownloader(args.output, args.limit, args.concurrency, args.rate, args.state)
+    report = downloader.run(keywords)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0 if report['failed'] == 0 else 1